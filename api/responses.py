@@ -0,0 +1,37 @@
+from fastapi.responses import ORJSONResponse
+from api import schemas
+
+
+# Caminho rapido para os dicts que o post_repository ja monta: gera a mesma
+# saida de schemas.PostPreview/PostDetail sem a segunda validacao do
+# response_model, e o ORJSONResponse codifica. Campos internos (updated_at,
+# bookmarked_at, ...) ficam de fora como ficariam no schema.
+def post_preview(post: dict) -> dict:
+    return {
+        "uuid": post["uuid"],
+        "title": post["title"],
+        "content": schemas.preview_content(post["content"]),
+        "username": post["username"],
+        "created_at": schemas.format_timestamp(post["created_at"]),
+        "is_bookmarked": post["is_bookmarked"],
+        "tags": post["tags"],
+        "reactions": post["reactions"],
+        "snippet": post.get("snippet"),
+    }
+
+
+def post_detail(post: dict) -> dict:
+    return {
+        "uuid": post["uuid"],
+        "title": post["title"],
+        "content": post["content"],
+        "username": post["username"],
+        "created_at": post["created_at"].isoformat(),
+        "is_bookmarked": post["is_bookmarked"],
+        "tags": post["tags"],
+        "reactions": post["reactions"],
+    }
+
+
+def post_previews(posts: list[dict], headers: dict | None = None) -> ORJSONResponse:
+    return ORJSONResponse([post_preview(post) for post in posts], headers=headers)
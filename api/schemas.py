@@ -106,6 +106,18 @@ class ReactionCountPreview(BaseModel):
     class Config:
         from_attributes = True
 
+PREVIEW_CONTENT_LENGTH = 240
+
+
+# Usadas pelos serializers abaixo e pelo caminho rapido de api/responses.py
+def preview_content(content: str) -> str:
+    return content[:PREVIEW_CONTENT_LENGTH] + '...' if len(content) > PREVIEW_CONTENT_LENGTH else content
+
+
+def format_timestamp(value: datetime.datetime) -> str:
+    return value.strftime('%Y-%m-%d %H:%M:%S')
+
+
 class PostPreview(BaseModel):
     uuid: UUID
     title: str
@@ -115,14 +127,16 @@ class PostPreview(BaseModel):
     is_bookmarked: bool
     tags: list[TagPreview]
     reactions: ReactionCountPreview
+    # Trecho do post ja escapado, com os termos da busca em <mark>
+    snippet: Optional[str] = None
 
     @field_serializer('content')
     def truncate_content(self, content: str) -> str:
-        return content[:240] + '...' if len(content) > 240 else content
+        return preview_content(content)
 
     @field_serializer('created_at')
     def format_created_at(self, created_at: str) -> str:    
-        return created_at.strftime('%Y-%m-%d %H:%M:%S')
+        return format_timestamp(created_at)
     class Config:
         from_attributes = True
 
@@ -142,6 +156,7 @@ class ReactionResponse(BaseModel):
     status: str
     message: str
     reaction: str
+    changed: bool = True
     counts: ReactionCount
 
 
@@ -183,6 +198,25 @@ class UserPreview(BaseModel):
         from_attributes = True
 
 
+class UserSuggestion(BaseModel):
+    uuid: UUID
+    username: str
+    photo_url: Optional[str] = None
+
+    @field_serializer('photo_url')
+    def format_photo_url(self, photo_url: str) -> HttpUrl:
+        if not photo_url:
+            photo_url = HttpUrl(
+                "https://ui-avatars.com/api/?name={username}&background=random".format(
+                    username=self.username
+                    )
+                )
+        return photo_url
+
+    class Config:
+        from_attributes = True
+
+
 class UserProfileVisit(BaseModel):
     username: str
     bio: str
@@ -216,6 +250,13 @@ class NotificationCreateRequest(BaseModel):
     user_generator: UUID
     user_receiver: UUID
     post_id: UUID
+    event: Optional[str] = None
+    actor_name: Optional[str] = None
+    post_title: Optional[str] = None
+
+class NotificationReadRequest(BaseModel):
+    before: Optional[datetime.datetime] = None
+    uuids: Optional[list[UUID]] = None
 
 class NotificationResponse(BaseModel):
     uuid: UUID
@@ -224,7 +265,9 @@ class NotificationResponse(BaseModel):
     message: str
     read: bool
     notification_type: str
+    event_count: int = 1
     created_at: datetime.datetime
+    updated_at: datetime.datetime
 
     @field_serializer('created_at')
     def format_created_at(self, created_at: str) -> str:    
@@ -1,28 +1,107 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import os
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-DATABASE_URL = "sqlite+aiosqlite:///./sql_app.db"  
-SYNC_DATABASE_URL = "sqlite:///./sql_app.db"
+load_dotenv()
 
-sync_engine = create_engine(
-    SYNC_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    echo=True 
-)
+# Driver sincrono equivalente a cada driver async suportado
+SYNC_DRIVERS = {
+    "sqlite+aiosqlite": "sqlite",
+    "postgresql+asyncpg": "postgresql+psycopg2",
+}
 
-async_engine = create_async_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    echo=True 
-)
 
-SessionLocal = sessionmaker(
-    autocommit=False,
-    autoflush=False,
-    bind=sync_engine
-)
+def _sync_url(url: str) -> str:
+    async_url = make_url(url)
+    sync_driver = SYNC_DRIVERS.get(async_url.drivername, async_url.drivername)
+    return async_url.set(drivername=sync_driver).render_as_string(hide_password=False)
+
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./sql_app.db")
+SYNC_DATABASE_URL = os.getenv("SYNC_DATABASE_URL") or _sync_url(DATABASE_URL)
+
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# Aplicados em toda conexao nova. WAL permite leituras concorrentes com a escrita.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-64000")),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000")),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def _engine_options(url: str) -> dict:
+    options = {
+        "echo": DB_ECHO,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+    }
+    if url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        # Conexoes de rede podem cair ou ser encerradas pelo servidor
+        options["pool_pre_ping"] = DB_POOL_PRE_PING
+        options["pool_recycle"] = DB_POOL_RECYCLE
+    return options
+
+
+def build_async_engine(url: str = DATABASE_URL) -> AsyncEngine:
+    engine = create_async_engine(url, **_engine_options(url))
+    if engine.dialect.name == "sqlite":
+        event.listen(engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    return engine
+
+
+async def engine_settings(engine: AsyncEngine) -> dict:
+    settings = {
+        "url": engine.url.render_as_string(hide_password=True),
+        "echo": engine.echo,
+        "pool": type(engine.pool).__name__,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+    }
+    if engine.dialect.name != "sqlite":
+        settings["pool_pre_ping"] = DB_POOL_PRE_PING
+        settings["pool_recycle"] = DB_POOL_RECYCLE
+    if engine.dialect.name == "sqlite":
+        async with engine.connect() as connection:
+            for name in SQLITE_PRAGMAS:
+                result = await connection.exec_driver_sql(f"PRAGMA {name}")
+                settings[name] = result.scalar()
+    return settings
+
+
+# insert() com ON CONFLICT / RETURNING do dialeto da sessao
+DIALECT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def dialect_insert(session: AsyncSession, table):
+    return DIALECT_INSERTS[session.bind.dialect.name](table)
+
+
+async_engine = build_async_engine(DATABASE_URL)
 
 AsyncSessionLocal = sessionmaker(
     async_engine,
@@ -30,4 +109,4 @@ AsyncSessionLocal = sessionmaker(
     expire_on_commit=False
 )
 
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
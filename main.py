@@ -1,16 +1,42 @@
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from database import Base, sync_engine
+from database import async_engine, engine_settings
 from routers import user_router, tag_router, post_router, notification_router
-from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
+from services import startup_service
+from services.notification_service import notification_queue
+from services.reaction_counter_service import reaction_buffer
+from singleton.log import logger
+from utils import security, query_stats
 
-load_dotenv()
 
-Base.metadata.create_all(bind=sync_engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    logger.info("Database settings: {}".format(await engine_settings(async_engine)))
+    await startup_service.check_schema_version(async_engine)
+    await startup_service.prewarm_pool(async_engine)
+    await startup_service.prime_caches()
+    await reaction_buffer.start()
+    await notification_queue.start()
+    logger.info("Startup finished in {:.1f}ms".format((time.perf_counter() - started) * 1000))
 
+    yield
 
-app = FastAPI()
+    await notification_queue.stop()
+    await reaction_buffer.stop()
+    startup_service.log_cache_stats()
+    security.shutdown_executor()
+    await async_engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+query_stats.install(async_engine.sync_engine)
+app.add_middleware(query_stats.QueryStatsMiddleware)
 
 
 origins = [
@@ -29,6 +55,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.include_router(post_router.router, prefix="/api")
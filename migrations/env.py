@@ -0,0 +1,91 @@
+import logging
+from logging.config import fileConfig
+
+from alembic import context
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect, pool, Uuid
+
+import models
+from database import SYNC_DATABASE_URL
+
+config = context.config
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = models.Base.metadata
+logger = logging.getLogger("alembic.env")
+
+# Schema que o antigo create_all do startup criava
+LEGACY_REVISION = "0001"
+
+
+# O SQLite guarda UUID como CHAR(32) e a reflexao nao reconhece o tipo;
+# ignora essa diferenca para o autogenerate nao gerar alter_column falso
+def compare_type(context, inspected_column, metadata_column, inspected_type, metadata_type):
+    if context.dialect.name == "sqlite" and isinstance(metadata_type, Uuid):
+        return False
+    return None
+
+
+# Objetos criados com SQL cru nas migracoes (FTS5 e suas tabelas internas, e a
+# chave search_id do indice no SQLite)
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == "table" and name.startswith("posts_fts"):
+        return False
+    if type_ == "index" and name in ("ix_posts_search", "ix_posts_search_id"):
+        return False
+    if type_ == "column" and name == "search_id" and object.table.name == "posts":
+        return False
+    return True
+
+
+# Bancos criados pelo create_all do startup antigo tem o schema da 0001 mas nao
+# tem alembic_version: sem o stamp a 0001 tenta criar tabelas que ja existem, o
+# upgrade falha e o container reinicia em loop
+def stamp_legacy_schema(connection) -> None:
+    migration_context = context.get_context()
+    if migration_context.get_current_revision() is not None:
+        return
+    if not inspect(connection).has_table("users"):
+        return
+    logger.warning("Unversioned schema found (created by create_all); stamping revision %s", LEGACY_REVISION)
+    migration_context.stamp(ScriptDirectory.from_config(config), LEGACY_REVISION)
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=SYNC_DATABASE_URL,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=SYNC_DATABASE_URL.startswith("sqlite"),
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connectable = create_engine(SYNC_DATABASE_URL, poolclass=pool.NullPool)
+
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            compare_type=compare_type,
+            include_object=include_object,
+            # SQLite nao suporta ALTER TABLE completo
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+
+        with context.begin_transaction():
+            stamp_legacy_schema(connection)
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,73 @@
+"""post search index
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Mantido em sincronia com post_repository.SEARCH_CONFIG
+SEARCH_CONFIG = "portuguese"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "sqlite":
+        # Tabela FTS5 de conteudo externo apontando para o rowid de posts.
+        # O rowid implicito pode mudar em um VACUUM; nesse caso execute
+        # INSERT INTO posts_fts(posts_fts) VALUES('rebuild')
+        op.execute(
+            "CREATE VIRTUAL TABLE posts_fts USING fts5("
+            "title, content, content='posts', content_rowid='rowid', "
+            "tokenize='unicode61 remove_diacritics 2')"
+        )
+        op.execute(
+            "CREATE TRIGGER posts_fts_ai AFTER INSERT ON posts BEGIN "
+            "INSERT INTO posts_fts(rowid, title, content) VALUES (new.rowid, new.title, new.content); "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER posts_fts_ad AFTER DELETE ON posts BEGIN "
+            "INSERT INTO posts_fts(posts_fts, rowid, title, content) VALUES ('delete', old.rowid, old.title, old.content); "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER posts_fts_au AFTER UPDATE OF title, content ON posts BEGIN "
+            "INSERT INTO posts_fts(posts_fts, rowid, title, content) VALUES ('delete', old.rowid, old.title, old.content); "
+            "INSERT INTO posts_fts(rowid, title, content) VALUES (new.rowid, new.title, new.content); "
+            "END"
+        )
+        op.execute("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')")
+
+    elif dialect == "postgresql":
+        op.execute(
+            "CREATE INDEX ix_posts_search ON posts USING GIN "
+            "(to_tsvector('{}', title || ' ' || content))".format(SEARCH_CONFIG)
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "sqlite":
+        op.execute("DROP TRIGGER IF EXISTS posts_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS posts_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS posts_fts_ai")
+        op.execute("DROP TABLE IF EXISTS posts_fts")
+
+    elif dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_posts_search")
@@ -0,0 +1,44 @@
+"""post search prefix index
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _create_posts_fts(options: str) -> None:
+    # Os triggers de 0005 referenciam a tabela pelo nome e continuam valendo
+    op.execute("DROP TABLE IF EXISTS posts_fts")
+    op.execute(
+        "CREATE VIRTUAL TABLE posts_fts USING fts5("
+        "title, content, content='posts', content_rowid='rowid', "
+        "tokenize='unicode61 remove_diacritics 2'{})".format(options)
+    )
+    op.execute("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A busca manda cada termo como prefixo ("termo"*); sem indice de prefixo o
+    # FTS5 percorre todos os termos que comecam com ele. No PostgreSQL o GIN
+    # ja atende to_tsquery com :*
+    if op.get_bind().dialect.name == "sqlite":
+        _create_posts_fts(", prefix='2 3 4'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "sqlite":
+        _create_posts_fts("")
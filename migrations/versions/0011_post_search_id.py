@@ -0,0 +1,89 @@
+"""post search id
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0011'
+down_revision: Union[str, None] = '0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FTS_OPTIONS = "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4'"
+
+
+def _create_posts_fts(key: str) -> None:
+    op.execute("DROP TABLE IF EXISTS posts_fts")
+    op.execute(
+        "CREATE VIRTUAL TABLE posts_fts USING fts5("
+        "title, content, content='posts', content_rowid='{}', {})".format(key, FTS_OPTIONS)
+    )
+
+
+def _create_triggers(key: str, assign: str = "") -> None:
+    op.execute(
+        "CREATE TRIGGER posts_fts_ai AFTER INSERT ON posts BEGIN {}"
+        "INSERT INTO posts_fts(rowid, title, content) "
+        "SELECT {key}, title, content FROM posts WHERE rowid = new.rowid; "
+        "END".format(assign, key=key)
+    )
+    op.execute(
+        "CREATE TRIGGER posts_fts_ad AFTER DELETE ON posts BEGIN "
+        "INSERT INTO posts_fts(posts_fts, rowid, title, content) VALUES ('delete', old.{key}, old.title, old.content); "
+        "END".format(key=key)
+    )
+    op.execute(
+        "CREATE TRIGGER posts_fts_au AFTER UPDATE OF title, content ON posts BEGIN "
+        "INSERT INTO posts_fts(posts_fts, rowid, title, content) VALUES ('delete', old.{key}, old.title, old.content); "
+        "INSERT INTO posts_fts(rowid, title, content) VALUES (new.{key}, new.title, new.content); "
+        "END".format(key=key)
+    )
+
+
+def _drop_triggers() -> None:
+    for trigger in ("posts_fts_au", "posts_fts_ad", "posts_fts_ai"):
+        op.execute("DROP TRIGGER IF EXISTS {}".format(trigger))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # posts tem chave UUID, entao o rowid implicito que o posts_fts usava pode
+    # ser renumerado por um VACUUM e o indice passaria a apontar para outros
+    # posts. search_id e uma coluna de verdade, preenchida no insert com o
+    # proximo numero da sequencia e nunca alterada depois. So existe no SQLite;
+    # o PostgreSQL indexa a expressao direto na tabela
+    if op.get_bind().dialect.name != "sqlite":
+        return
+
+    _drop_triggers()
+    op.execute("ALTER TABLE posts ADD COLUMN search_id INTEGER")
+    # Mantem a ordem de insercao: a busca usa search_id como ordem de recencia
+    op.execute("UPDATE posts SET search_id = rowid")
+    op.execute("CREATE UNIQUE INDEX ix_posts_search_id ON posts (search_id)")
+    _create_triggers("search_id", (
+        "UPDATE posts SET search_id = (SELECT COALESCE(MAX(search_id), 0) + 1 FROM posts) "
+        "WHERE rowid = new.rowid AND new.search_id IS NULL; "
+    ))
+    _create_posts_fts("search_id")
+    op.execute("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "sqlite":
+        return
+
+    _drop_triggers()
+    op.execute("DROP INDEX IF EXISTS ix_posts_search_id")
+    op.execute("ALTER TABLE posts DROP COLUMN search_id")
+    _create_triggers("rowid")
+    _create_posts_fts("rowid")
+    op.execute("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')")
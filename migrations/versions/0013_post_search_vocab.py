@@ -0,0 +1,34 @@
+"""post search vocab
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0013'
+down_revision: Union[str, None] = '0012'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Dicionario do posts_fts, usado pela busca para expandir prefixos maiores
+    # que os do indice de prefixo. O tipo instance e lido sob demanda: achar o
+    # proximo termo de um intervalo nao percorre o doclist inteiro. Nao guarda
+    # dados; le direto do indice
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute("CREATE VIRTUAL TABLE posts_fts_vocab USING fts5vocab(posts_fts, instance)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute("DROP TABLE IF EXISTS posts_fts_vocab")
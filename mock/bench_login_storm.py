@@ -0,0 +1,151 @@
+import os
+import re
+import sys
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+import statistics
+from contextlib import contextmanager
+
+# Latencia do /posts/preview no mesmo worker enquanto um "login storm" roda,
+# com o bcrypt no pool de processos, no pool de threads e inline no event loop
+# (o comportamento antigo). Sobe o app em processo contra um SQLite temporario.
+# Uso: python -m mock.bench_login_storm [--seconds 6] [--logins 8] [--posts 200]
+
+PASSWORD = "Passw0rd!"
+MODES = ("idle", "process", "thread", "inline")
+
+
+def _prepare(workdir: str) -> None:
+    # O app le essas variaveis na importacao
+    os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///{}".format(os.path.join(workdir, "bench.db"))
+    os.environ.pop("SYNC_DATABASE_URL", None)
+    os.environ["LOG_DIR"] = os.path.join(workdir, "logs")
+    os.makedirs(os.path.join(workdir, "static"), exist_ok=True)
+    os.chdir(workdir)
+
+
+def _seed(posts: int) -> None:
+    from alembic import command
+    from alembic.config import Config
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    import models
+    from database import SYNC_DATABASE_URL
+    from services.startup_service import ALEMBIC_INI
+
+    command.upgrade(Config(ALEMBIC_INI), "head")
+    engine = create_engine(SYNC_DATABASE_URL)
+    with Session(engine) as db:
+        tags = [models.Tag(name="Tag {}".format(i), group="Bench", color="#f43f5e") for i in range(10)]
+        author = models.User(username="author", email="author@example.com", password="-")
+        db.add_all(tags + [author])
+        db.flush()
+        for i in range(posts):
+            post = models.Post(title="Post {}".format(i), content="conteudo " * 80, user_id=author.uuid)
+            post.tags.extend(random.sample(tags, k=2))
+            db.add(post)
+        db.commit()
+    engine.dispose()
+
+
+def _percentile(samples: list[float], fraction: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+@contextmanager
+def _hashing(mode: str):
+    from utils import security
+
+    original_executor, original_run = security.HASH_EXECUTOR, security._run_in_pool
+    security.shutdown_executor()
+    if mode in ("process", "thread"):
+        security.HASH_EXECUTOR = mode
+    elif mode == "inline":
+        # bcrypt direto no event loop, como antes do pool
+        async def inline(func, *args):
+            return func(*args)
+        security._run_in_pool = inline
+    try:
+        yield
+    finally:
+        security.shutdown_executor()
+        security.HASH_EXECUTOR, security._run_in_pool = original_executor, original_run
+
+
+async def _scenario(client, mode: str, seconds: float, logins: int) -> dict:
+    credentials = dict(email="reader@example.com", password=PASSWORD, remember=False)
+    stop = time.monotonic() + seconds
+    latencies, statuses = [], {}
+
+    async def storm():
+        while time.monotonic() < stop:
+            response = await client.post("/api/login", json=credentials, cookies={})
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    async def reader():
+        while time.monotonic() < stop:
+            started = time.perf_counter()
+            response = await client.get("/api/posts/preview")
+            latencies.append((time.perf_counter() - started) * 1000)
+            response.raise_for_status()
+            await asyncio.sleep(0.01)
+
+    with _hashing(mode):
+        await asyncio.gather(reader(), *(storm() for _ in range(logins if mode != "idle" else 0)))
+    latencies.sort()
+    return {
+        "reads": len(latencies),
+        "p50": statistics.median(latencies),
+        "p99": _percentile(latencies, 0.99),
+        "max": latencies[-1],
+        "logins": statuses,
+    }
+
+
+async def run(seconds: float, logins: int, modes: list[str]) -> dict:
+    import httpx
+    import main
+
+    results = {}
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await client.post("/api/register", data=dict(
+                email="reader@example.com", username="reader", password=PASSWORD, confirm_password=PASSWORD
+            ))
+            response = await client.post("/api/login", json=dict(email="reader@example.com", password=PASSWORD, remember=False))
+            client.cookies.set("access_token", re.search(r"access_token=([^;]+)", response.headers["set-cookie"]).group(1))
+
+            for mode in modes:
+                results[mode] = await _scenario(client, mode, seconds, logins)
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="/posts/preview latency during a login storm")
+    parser.add_argument("--seconds", type=float, default=6)
+    parser.add_argument("--logins", type=int, default=8, help="concurrent login loops")
+    parser.add_argument("--posts", type=int, default=200)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    args = parser.parse_args(argv)
+
+    random.seed(3)
+    _prepare(tempfile.mkdtemp(prefix="dropit-bench-"))
+    _seed(args.posts)
+    logging.getLogger("dropit").setLevel(logging.ERROR)
+
+    results = asyncio.run(run(args.seconds, args.logins, args.modes))
+    print("{:<8} {:>6} {:>9} {:>9} {:>9}  logins".format("mode", "reads", "p50 ms", "p99 ms", "max ms"))
+    for mode, result in results.items():
+        print("{:<8} {:>6} {:>9.1f} {:>9.1f} {:>9.1f}  {}".format(
+            mode, result["reads"], result["p50"], result["p99"], result["max"], result["logins"]
+        ))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
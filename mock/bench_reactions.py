@@ -0,0 +1,156 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+
+# Vazao de reacoes (reacoes/s) em poucos posts "quentes", com os contadores
+# gravados na mesma transacao da reacao e com o ReactionCounterBuffer. Chama o
+# reaction_repository direto contra um SQLite temporario e confere no fim se os
+# contadores batem com o COUNT de post_reactions.
+# Uso: python -m mock.bench_reactions [--reactions 5000] [--posts 5] [--users 500] [--concurrency 50]
+
+MODES = ("direct", "buffered")
+
+
+def _prepare(workdir: str) -> None:
+    # O app le essas variaveis na importacao
+    os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///{}".format(os.path.join(workdir, "bench.db"))
+    os.environ.pop("SYNC_DATABASE_URL", None)
+    os.environ["LOG_DIR"] = os.path.join(workdir, "logs")
+    os.chdir(workdir)
+
+
+def _migrate() -> None:
+    from alembic import command
+    from alembic.config import Config
+    from services.startup_service import ALEMBIC_INI
+
+    command.upgrade(Config(ALEMBIC_INI), "head")
+
+
+async def _seed(prefix: str, posts: int, users: int) -> tuple[list, list]:
+    import models
+    from database import AsyncSessionLocal
+    from repository import user_stats_repository
+
+    async with AsyncSessionLocal() as db:
+        reactors = [
+            models.User(username="{}{}".format(prefix, i), email="{}{}@example.com".format(prefix, i), password="-")
+            for i in range(users)
+        ]
+        author = models.User(username=prefix, email="{}@example.com".format(prefix), password="-")
+        db.add_all(reactors + [author])
+        await db.flush()
+        hot = [models.Post(title="Post {}".format(i), content="...", user_id=author.uuid) for i in range(posts)]
+        db.add_all(hot)
+        await db.flush()
+        await user_stats_repository.apply_delta(db, author.uuid, last_post_date=hot[-1].created_at, post_count=posts)
+        await db.commit()
+    return hot, reactors
+
+
+async def _consistent(posts: list) -> bool:
+    import models
+    from sqlalchemy import select, func
+    from database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        for post in posts:
+            counts = await db.get(models.PostReactionCount, post.uuid)
+            rows = dict((await db.execute(
+                select(models.PostReaction.reaction_type, func.count())
+                .where(models.PostReaction.post_id == post.uuid)
+                .group_by(models.PostReaction.reaction_type)
+            )).all())
+            for reaction in models.ReactionType:
+                if (getattr(counts, reaction.value) if counts else 0) != rows.get(reaction, 0):
+                    return False
+    return True
+
+
+async def _scenario(mode: str, reactions: int, posts: int, users: int, concurrency: int) -> dict:
+    import models
+    from database import AsyncSessionLocal
+    from repository import reaction_repository
+    from services.reaction_counter_service import reaction_buffer
+
+    kinds = [reaction.value for reaction in models.ReactionType]
+    hot, reactors = await _seed("{}_".format(mode), posts, users)
+    gate = asyncio.Semaphore(concurrency)
+    errors = 0
+
+    async def react() -> None:
+        nonlocal errors
+        async with gate:
+            async with AsyncSessionLocal() as db:
+                response = await reaction_repository.create_post_reaction(
+                    db, random.choice(hot), random.choice(reactors), random.choice(kinds)
+                )
+        if response["status"] != "success":
+            errors += 1
+
+    reaction_buffer.enabled = mode == "buffered"
+    await reaction_buffer.start()
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(react() for _ in range(reactions)))
+        elapsed = time.perf_counter() - started
+    finally:
+        await reaction_buffer.stop()
+        stats = reaction_buffer.stats()
+        reaction_buffer.enabled = False
+
+    return {
+        "per_second": reactions / elapsed,
+        "seconds": elapsed,
+        "errors": errors,
+        "flushes": stats["flushes"],
+        "consistent": await _consistent(hot),
+    }
+
+
+async def run(reactions: int, posts: int, users: int, concurrency: int, modes: list[str]) -> dict:
+    from database import async_engine
+    from services.reaction_counter_service import reaction_buffer
+
+    enabled = reaction_buffer.enabled
+    results = {}
+    try:
+        for mode in modes:
+            results[mode] = await _scenario(mode, reactions, posts, users, concurrency)
+    finally:
+        reaction_buffer.enabled = enabled
+        await async_engine.dispose()
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Reaction throughput with and without the counter buffer")
+    parser.add_argument("--reactions", type=int, default=5000)
+    parser.add_argument("--posts", type=int, default=5, help="hot posts receiving the reactions")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    args = parser.parse_args(argv)
+
+    random.seed(17)
+    _prepare(tempfile.mkdtemp(prefix="dropit-bench-"))
+    _migrate()
+    logging.getLogger("dropit").setLevel(logging.CRITICAL)
+
+    results = asyncio.run(run(args.reactions, args.posts, args.users, args.concurrency, args.modes))
+    print("{:<9} {:>10} {:>9} {:>7} {:>8}  counts".format("mode", "reacts/s", "seconds", "errors", "flushes"))
+    for mode, result in results.items():
+        print("{:<9} {:>10.0f} {:>9.2f} {:>7} {:>8}  {}".format(
+            mode, result["per_second"], result["seconds"], result["errors"], result["flushes"],
+            "ok" if result["consistent"] else "MISMATCH"
+        ))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+import os
+import sys
+import time
+import uuid
+import random
+import asyncio
+import logging
+import argparse
+import datetime
+import tempfile
+import statistics
+
+# Latencia da busca do /posts/preview (pipeline completo do post_repository)
+# com o indice FTS5 contra o filtro ILIKE antigo, em bases de 10k, 100k e 1M
+# posts num SQLite temporario. A base cresce entre os tamanhos.
+# Uso: python -m mock.bench_search [--sizes 10000 100000 1000000] [--rounds 10]
+
+BATCH = 20000
+SYLLABLES = ["ma", "ri", "so", "lu", "ta", "ne", "vi", "co", "ra", "de", "pe", "li", "mo", "sa", "te", "fa"]
+
+
+def _vocabulary(size: int) -> list[str]:
+    words = set()
+    while len(words) < size:
+        words.add("".join(random.choices(SYLLABLES, k=random.randint(2, 4))))
+    return sorted(words)
+
+
+def _prepare(workdir: str) -> None:
+    # O app le essas variaveis na importacao
+    os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///{}".format(os.path.join(workdir, "bench.db"))
+    os.environ.pop("SYNC_DATABASE_URL", None)
+    os.environ["LOG_DIR"] = os.path.join(workdir, "logs")
+    os.chdir(workdir)
+
+
+def _grow(engine, author_id: uuid.UUID, words: list[str], weights: list[float], start: int, stop: int) -> None:
+    import models
+
+    posts = models.Post.__table__
+    now = datetime.datetime.utcnow()
+    with engine.begin() as connection:
+        for first in range(start, stop, BATCH):
+            connection.execute(posts.insert(), [
+                {
+                    "uuid": uuid.uuid4(),
+                    "title": " ".join(random.choices(words, weights, k=6)),
+                    "content": " ".join(random.choices(words, weights, k=random.randint(40, 200))),
+                    "user_id": author_id,
+                    "created_at": now - datetime.timedelta(seconds=i),
+                    "updated_at": now,
+                }
+                for i in range(first, min(first + BATCH, stop))
+            ])
+
+
+# cold limpa o search_cache antes de cada busca: inclui as consultas ao
+# dicionario e a contagem das frases que a primeira busca de um texto faz
+async def _measure(db, viewer, search: str, rounds: int, cold: bool = False) -> tuple[float, int]:
+    from repository import post_repository
+    from singleton.cache import search_cache
+
+    posts = await post_repository.get_posts_preview(db, viewer, per_page=10, search=search)
+    samples = []
+    for _ in range(rounds):
+        if cold:
+            search_cache.clear()
+        started = time.perf_counter()
+        await post_repository.get_posts_preview(db, viewer, per_page=10, search=search)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), len(posts)
+
+
+# Sem indice textual o repositorio cai no filtro ILIKE
+async def _no_text_index(*args):
+    return None
+
+
+async def _search_round(viewer, queries: dict, rounds: int) -> dict:
+    from database import AsyncSessionLocal
+    from repository import post_repository
+
+    ranked_search = post_repository._ranked_search
+    results = {}
+    async with AsyncSessionLocal() as db:
+        for label, search in queries.items():
+            fts = await _measure(db, viewer, search, rounds)
+            cold = await _measure(db, viewer, search, rounds, cold=True)
+            post_repository._ranked_search = _no_text_index
+            try:
+                ilike = await _measure(db, viewer, search, rounds)
+            finally:
+                post_repository._ranked_search = ranked_search
+            results[label] = (fts, cold, ilike)
+    return results
+
+
+def run(sizes: list[int], rounds: int) -> dict:
+    from alembic import command
+    from alembic.config import Config
+    from sqlalchemy import create_engine
+    import models
+    from database import SYNC_DATABASE_URL, async_engine
+    from services.startup_service import ALEMBIC_INI
+
+    command.upgrade(Config(ALEMBIC_INI), "head")
+    engine = create_engine(SYNC_DATABASE_URL)
+    author = models.User(uuid=uuid.uuid4(), username="author", email="author@example.com", password="-")
+    viewer = models.User(uuid=uuid.uuid4(), username="viewer", email="viewer@example.com", password="-")
+    with engine.begin() as connection:
+        connection.execute(models.User.__table__.insert(), [
+            {"uuid": user.uuid, "username": user.username, "email": user.email, "password": "-"}
+            for user in (author, viewer)
+        ])
+
+    # Frequencia tipo Zipf: as primeiras palavras aparecem em quase todo post
+    words = _vocabulary(5000)
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    queries = {
+        "common word": words[0],
+        "rare word": words[-1],
+        "two words": "{} {}".format(words[3], words[40]),
+        "prefix": words[10][:3],
+        # Maior que o indice de prefixo (prefix='2 3 4'), como durante a digitacao
+        "typing": words[40][:5],
+        # Sem resultados o ILIKE varre a tabela inteira
+        "no match": "xyzw",
+    }
+
+    results = {}
+    loaded = 0
+    for size in sorted(sizes):
+        started = time.perf_counter()
+        _grow(engine, author.uuid, words, weights, loaded, size)
+        loaded = size
+        print("{:>9} posts loaded in {:.1f}s".format(size, time.perf_counter() - started), flush=True)
+        results[size] = asyncio.run(_search_round(viewer, queries, rounds))
+        asyncio.run(async_engine.dispose())
+    engine.dispose()
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Post search latency, FTS5 vs ILIKE")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    random.seed(12)
+    _prepare(tempfile.mkdtemp(prefix="dropit-bench-"))
+    logging.getLogger("dropit").setLevel(logging.ERROR)
+
+    results = run(args.sizes, args.rounds)
+    print("{:>9}  {:<12} {:>10} {:>10} {:>10} {:>10}  hits".format(
+        "posts", "query", "fts ms", "cold ms", "ilike ms", "ilike/fts"
+    ))
+    for size, queries in results.items():
+        for label, ((fts, fts_hits), (cold, _), (ilike, ilike_hits)) in queries.items():
+            print("{:>9}  {:<12} {:>10.2f} {:>10.2f} {:>10.2f} {:>9.1f}x  {}/{}".format(
+                size, label, fts, cold, ilike, ilike / fts, fts_hits, ilike_hits
+            ))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
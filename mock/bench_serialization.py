@@ -0,0 +1,97 @@
+import sys
+import time
+import uuid
+import random
+import asyncio
+import datetime
+import argparse
+import orjson
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from api import responses, schemas
+
+# Microbenchmark da serializacao de uma pagina do feed, sem banco: o caminho
+# padrao do FastAPI (response_model + JSONResponse) contra api/responses.
+# Uso: python -m mock.bench_serialization [--posts 100] [--rounds 500]
+
+TAGS = [{"name": "Tag {}".format(i), "color": "#{:06x}".format(i * 99991 % 0xffffff)} for i in range(45)]
+
+
+def fake_page(size: int) -> list[dict]:
+    now = datetime.datetime(2026, 10, 18, 12, 0, 0, 123456)
+    return [
+        {
+            "uuid": str(uuid.uuid4()),
+            "title": "Post {}".format(i),
+            "content": "conteudo do post " * random.randint(5, 60),
+            "username": "user{}".format(i % 17),
+            "created_at": now - datetime.timedelta(minutes=i),
+            "updated_at": (now - datetime.timedelta(minutes=i)).isoformat(),
+            "is_bookmarked": i % 3 == 0,
+            "tags": random.sample(TAGS, 3),
+            "reactions": {
+                "love": random.randint(0, 500),
+                "like": random.randint(0, 500),
+                "support": random.randint(0, 500),
+                "sad": random.randint(0, 500),
+                "user_reaction": random.choice([None, "love", "like"]),
+            },
+        }
+        for i in range(size)
+    ]
+
+
+async def _default_path(field, page: list[dict]) -> bytes:
+    content = await serialize_response(field=field, response_content=page)
+    return JSONResponse(content).body
+
+
+async def _validated_orjson(field, page: list[dict]) -> bytes:
+    content = await serialize_response(field=field, response_content=page)
+    return ORJSONResponse(content).body
+
+
+async def _trusted_path(field, page: list[dict]) -> bytes:
+    return responses.post_previews(page).body
+
+
+async def run(posts: int, rounds: int) -> dict:
+    random.seed(42)
+    page = fake_page(posts)
+    field = create_model_field(name="Response_bench", type_=list[schemas.PostPreview], mode="serialization")
+
+    results = {}
+    bodies = {}
+    for name, path in (
+        ("response_model + JSONResponse", _default_path),
+        ("response_model + ORJSONResponse", _validated_orjson),
+        ("api.responses + ORJSONResponse", _trusted_path),
+    ):
+        bodies[name] = await path(field, page)
+        started = time.perf_counter()
+        for _ in range(rounds):
+            await path(field, page)
+        results[name] = (time.perf_counter() - started) / rounds * 1000
+
+    # Os tres caminhos tem que produzir o mesmo JSON
+    if len({repr(orjson.loads(body)) for body in bodies.values()}) != 1:
+        raise RuntimeError("serialization paths disagree")
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Serialization cost per feed page")
+    parser.add_argument("--posts", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args.posts, args.rounds))
+    baseline = next(iter(results.values()))
+    for name, elapsed in results.items():
+        print("{:<34} {:8.3f} ms/page  {:5.1f}x".format(name, elapsed, baseline / elapsed))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
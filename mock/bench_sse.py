@@ -0,0 +1,190 @@
+import os
+import re
+import sys
+import time
+import asyncio
+import argparse
+import resource
+import tempfile
+import statistics
+import subprocess
+
+# Custo de manter N conexoes ociosas em /notifications/stream num unico worker:
+# tempo para abrir, RSS do servidor, heartbeats recebidos e latencia de
+# /notifications/count com as conexoes abertas. Sobe um uvicorn de verdade
+# contra um SQLite temporario (le o RSS em /proc, entao so roda no Linux).
+# Uso: python -m mock.bench_sse [--connections 10000] [--heartbeat 5] [--idle 20]
+
+PASSWORD = "Passw0rd!"
+HOST = "127.0.0.1"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _environment(workdir: str, heartbeat: float, connections: int) -> dict:
+    env = dict(os.environ)
+    env["DATABASE_URL"] = "sqlite+aiosqlite:///{}".format(os.path.join(workdir, "bench.db"))
+    env.pop("SYNC_DATABASE_URL", None)
+    env["LOG_DIR"] = os.path.join(workdir, "logs")
+    env["NOTIFICATION_STREAM_HEARTBEAT"] = str(heartbeat)
+    env["NOTIFICATION_STREAM_MAX"] = str(connections)
+    env["PYTHONPATH"] = ROOT
+    return env
+
+
+def _raise_fd_limit(connections: int) -> None:
+    # Cliente e servidor (que herda o limite) precisam de um descritor por conexao
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = connections + 1024
+    if soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(wanted, hard), hard))
+
+
+def _rss_mb(pid: int) -> float:
+    with open("/proc/{}/status".format(pid)) as status:
+        return int(re.search(r"VmRSS:\s+(\d+)", status.read()).group(1)) / 1024
+
+
+def _start_server(workdir: str, env: dict, port: int) -> subprocess.Popen:
+    os.makedirs(os.path.join(workdir, "static"), exist_ok=True)
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "-c", os.path.join(ROOT, "alembic.ini"), "upgrade", "head"],
+        cwd=ROOT, env=env, check=True, capture_output=True
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", HOST, "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=open(os.path.join(workdir, "server.log"), "w")
+    )
+
+
+async def _token(client) -> str:
+    deadline = time.monotonic() + 60
+    while True:
+        try:
+            await client.get("/openapi.json")
+            break
+        except Exception:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+    await client.post("/api/register", data=dict(
+        email="idle@example.com", username="idle", password=PASSWORD, confirm_password=PASSWORD
+    ))
+    response = await client.post("/api/login", json=dict(email="idle@example.com", password=PASSWORD, remember=False))
+    return re.search(r"access_token=([^;]+)", response.headers["set-cookie"]).group(1)
+
+
+async def _count_latency(client, seconds: float) -> list[float]:
+    stop = time.monotonic() + seconds
+    latencies = []
+    while time.monotonic() < stop:
+        started = time.perf_counter()
+        response = await client.get("/api/notifications/count")
+        latencies.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+        await asyncio.sleep(0.05)
+    return sorted(latencies)
+
+
+async def run(pid: int, port: int, connections: int, heartbeat: float, idle: float) -> dict:
+    import httpx
+
+    results = {}
+    async with httpx.AsyncClient(base_url="http://{}:{}".format(HOST, port), timeout=60) as client:
+        token = await _token(client)
+        client.cookies.set("access_token", token)
+        results["rss_before"] = _rss_mb(pid)
+        results["baseline"] = await _count_latency(client, 3)
+
+        request = "GET /api/notifications/stream HTTP/1.1\r\nHost: {}\r\nCookie: access_token={}\r\n\r\n".format(
+            HOST, token
+        ).encode()
+        opened, failed, heartbeats = 0, 0, 0
+        # Limita os handshakes em andamento: abrir tudo de uma vez estoura o
+        # backlog do listen e o kernel reseta conexoes antes do app ver
+        handshakes = asyncio.Semaphore(200)
+
+        async def connect():
+            nonlocal opened, failed, heartbeats
+            writer = None
+            try:
+                async with handshakes:
+                    reader, writer = await asyncio.open_connection(HOST, port)
+                    writer.write(request)
+                    await writer.drain()
+                    head = await reader.readuntil(b"\r\n\r\n")
+                if b" 200 " not in head.split(b"\r\n")[0]:
+                    failed += 1
+                    return
+                opened += 1
+                while line := await reader.readline():
+                    if line.startswith(b": heartbeat"):
+                        heartbeats += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                failed += 1
+            finally:
+                if writer is not None:
+                    writer.close()
+
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(connect()) for _ in range(connections)]
+        while opened + failed < connections and time.perf_counter() - started < 300:
+            await asyncio.sleep(0.2)
+        results["open_seconds"] = time.perf_counter() - started
+        results["opened"], results["failed"] = opened, failed
+        results["rss_open"] = _rss_mb(pid)
+
+        before = heartbeats
+        results["loaded"] = await _count_latency(client, idle)
+        results["heartbeats"] = heartbeats - before
+        results["expected_heartbeats"] = int(opened * idle / heartbeat)
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.sleep(3)
+        results["rss_closed"] = _rss_mb(pid)
+    return results
+
+
+def _summary(latencies: list[float]) -> str:
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return "p50 {:.1f} ms, p99 {:.1f} ms ({} calls)".format(statistics.median(latencies), p99, len(latencies))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Idle SSE connections held by a single worker")
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--heartbeat", type=float, default=5, help="NOTIFICATION_STREAM_HEARTBEAT for the server")
+    parser.add_argument("--idle", type=float, default=20, help="seconds to hold the connections open")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    _raise_fd_limit(args.connections)
+    workdir = tempfile.mkdtemp(prefix="dropit-bench-")
+    server = _start_server(workdir, _environment(workdir, args.heartbeat, args.connections), args.port)
+    try:
+        results = asyncio.run(run(server.pid, args.port, args.connections, args.heartbeat, args.idle))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    print("connections  {} opened, {} failed in {:.1f}s".format(
+        results["opened"], results["failed"], results["open_seconds"]
+    ))
+    print("server rss   {:.0f} MB idle, {:.0f} MB open ({:.1f} KB/connection), {:.0f} MB after close".format(
+        results["rss_before"], results["rss_open"],
+        (results["rss_open"] - results["rss_before"]) * 1024 / max(results["opened"], 1), results["rss_closed"]
+    ))
+    print("heartbeats   {} in {:.0f}s (expected ~{})".format(
+        results["heartbeats"], args.idle, results["expected_heartbeats"]
+    ))
+    print("count        {} without streams".format(_summary(results["baseline"])))
+    print("count        {} with {} streams open".format(_summary(results["loaded"]), results["opened"]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -72,11 +72,10 @@ TAGS_DATA =  [
 def create_fake_users(count=100):
     users = []
     for _ in range(count):
-        profile = fake.profile()
         user = User(
             uuid=uuid.uuid4(),
-            username=profile['username'],
-            email=fake.email(),
+            username=fake.unique.user_name(),
+            email=fake.unique.email(),
             bio=fake.sentence(nb_words=10),
             photo_url="",
             password=security.hash_password("Password@123"),
@@ -84,15 +83,16 @@ def create_fake_users(count=100):
         )
         users.append(user)
 
-        user = User(
-            uuid=uuid.uuid4(),
-            username="akaza",
-            email="alisson@gmail.com",
-            bio="Fukuna",
-            password=security.hash_password("Grindphanter2@"),
-            created_at=fake.date_time_this_year()
-        )
-        users.append(user)
+    # Usuario fixo para login local; fora do loop por causa dos indices unicos
+    user = User(
+        uuid=uuid.uuid4(),
+        username="akaza",
+        email="alisson@gmail.com",
+        bio="Fukuna",
+        password=security.hash_password("Grindphanter2@"),
+        created_at=fake.date_time_this_year()
+    )
+    users.append(user)
     return users
 
 def create_fake_tags():
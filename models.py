@@ -1,7 +1,7 @@
 from datetime import datetime, timezone
 from enum import Enum
 import uuid
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Integer, Text, Table, func, Enum as SqlEnum  
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Integer, Text, Table, Index, func, text, Enum as SqlEnum  
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from database import Base
@@ -24,9 +24,21 @@ class NotificationType(Enum):
     NEW = "new"
 
 
+# Filtro dos indices parciais: so linhas nao removidas sao consultadas
+NOT_DELETED = text("deleted_at IS NULL")
+
+def partial_index(name: str, *columns, **kwargs) -> Index:
+    return Index(name, *columns, sqlite_where=NOT_DELETED, postgresql_where=NOT_DELETED, **kwargs)
+
+
 
 class User(Base):
     __tablename__ = 'users'
+    __table_args__ = (
+        Index("ix_users_username", "username", unique=True),
+        Index("ix_users_email", "email", unique=True),
+        partial_index("ix_users_created_at_uuid_active", "created_at", "uuid"),
+    )
 
     uuid = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     username = Column(String(100), nullable=False)
@@ -81,6 +93,10 @@ class Tag(Base):
 
 class Post(Base):
     __tablename__ = 'posts'
+    __table_args__ = (
+        Index("ix_posts_user_id_created_at_uuid", "user_id", "created_at", "uuid"),
+        Index("ix_posts_created_at_uuid", "created_at", "uuid"),
+    )
 
     uuid = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     title = Column(String(100), nullable=False)
@@ -96,6 +112,9 @@ class Post(Base):
 
 class PostReaction(Base):
     __tablename__ = "post_reactions"
+    __table_args__ = (
+        Index("ix_post_reactions_post_id", "post_id"),
+    )
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.uuid"), primary_key=True)
     post_id = Column(UUID(as_uuid=True), ForeignKey("posts.uuid"), primary_key=True)
     reaction_type = Column(SqlEnum(ReactionType), nullable=False)
@@ -112,14 +131,36 @@ class PostReactionCount(Base):
     def __repr__(self):
         return f"<Post {self.post_id}>"
 
+# Agregados por autor mantidos junto com cada escrita (post, reacao, bookmark).
+# Pode ser reconstruida a partir das tabelas de origem: python -m services.user_stats_service rebuild
+class UserStats(Base):
+    __tablename__ = "user_stats"
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.uuid"), primary_key=True)
+    post_count = Column(Integer, nullable=False, default=0)
+    last_post_date = Column(DateTime, nullable=True)
+    love_count = Column(Integer, nullable=False, default=0)
+    like_count = Column(Integer, nullable=False, default=0)
+    support_count = Column(Integer, nullable=False, default=0)
+    sad_count = Column(Integer, nullable=False, default=0)
+    bookmarks_received = Column(Integer, nullable=False, default=0)
+    unread_notifications = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<UserStats {self.user_id}>"
+
 class PostBookmark(Base):
     __tablename__ = 'post_bookmarks'
+    __table_args__ = (
+        Index("ix_post_bookmarks_user_id_post_id", "user_id", "post_id", unique=True),
+        partial_index("ix_post_bookmarks_user_id_created_at_uuid", "user_id", "created_at", "uuid"),
+    )
 
     uuid = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     post_id = Column(UUID(as_uuid=True), ForeignKey('posts.uuid'))
     user_id = Column(UUID(as_uuid=True), ForeignKey('users.uuid'))
-    created_at = Column(DateTime, default=datetime.now())
-    updated_at = Column(DateTime, default=datetime.now(), onupdate=datetime.now())
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     deleted_at = Column(DateTime, nullable=True)
 
     post = relationship("Post", back_populates="bookmarks")
@@ -133,22 +174,41 @@ post_tags = Table(
     'post_tags',
     Base.metadata,
     Column('post_id', UUID(as_uuid=True), ForeignKey('posts.uuid')),
-    Column('tag_id', UUID(as_uuid=True), ForeignKey('tags.uuid'))
+    Column('tag_id', UUID(as_uuid=True), ForeignKey('tags.uuid')),
+    Index("ix_post_tags_post_id_tag_id", "post_id", "tag_id", unique=True)
 )
 
 
 
 class Notification(Base):
     __tablename__ = 'notifications'
+    __table_args__ = (
+        partial_index("ix_notifications_receiver_read_created_at", "user_receiver", "read", "created_at"),
+        partial_index("ix_notifications_receiver_updated_at_uuid", "user_receiver", "updated_at", "uuid"),
+        partial_index("ix_notifications_receiver_post_event", "user_receiver", "post_id", "event"),
+    )
 
     uuid = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_generator = Column(UUID(as_uuid=True), ForeignKey('users.uuid'))
-    user_receiver = Column(UUID(as_uuid=True), ForeignKey('posts.uuid'))
+    user_receiver = Column(UUID(as_uuid=True), ForeignKey('users.uuid'))
     post_id = Column(UUID(as_uuid=True), ForeignKey('posts.uuid'))
     title = Column(String(100), nullable=False)
     message = Column(String(255), nullable=False)
     read = Column(Boolean, default=False)
     notification_type = Column(SqlEnum(NotificationType), nullable=False)
+    # Notificacoes agregadas: origem ("reaction", "bookmark") e quantos autores
+    # distintos foram somados (ver NotificationActor); user_generator guarda o
+    # ultimo autor
+    event = Column(String(20), nullable=True)
+    event_count = Column(Integer, nullable=False, default=1, server_default="1")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    deleted_at = Column(DateTime, nullable=True)
\ No newline at end of file
+    deleted_at = Column(DateTime, nullable=True)
+
+
+# Autores distintos de uma notificacao agregada: o mesmo usuario repetindo o
+# evento nao aumenta o event_count
+class NotificationActor(Base):
+    __tablename__ = "notification_actors"
+    notification_id = Column(UUID(as_uuid=True), ForeignKey("notifications.uuid"), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.uuid"), primary_key=True)
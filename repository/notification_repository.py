@@ -1,96 +1,252 @@
 import models
 import uuid
+import datetime
 from singleton.log import logger
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, update, tuple_
 from sqlalchemy.future import select
 from api import schemas
+from repository import user_stats_repository
+from singleton.cache import unread_cache
 
 
 TAG = "Notification Repository -> "
 
-async def create_notification(
-        db: AsyncSession,
-        notification: schemas.NotificationCreateRequest,
+NOTIFICATION_TYPES = {
+    "att": models.NotificationType.ATT,
+    "new": models.NotificationType.NEW
+}
 
-    ):
-    notification_type_map = {
-        "att": models.NotificationType.ATT,
-        "new": models.NotificationType.NEW
-    }
+# Texto da notificacao agregada; {actor} e o autor mais recente e {others} os
+# demais autores distintos
+AGGREGATE_MESSAGES = {
+    "reaction": "O usuário {actor} e mais {others} reagiram ao seu post '{title}'",
+    "bookmark": "O usuário {actor} e mais {others} salvaram o seu post '{title}' como favorito",
+}
 
-    logger.info("{} User {} are trying to create a notification {}".format(
-        TAG, 
-        notification.user_generator, 
-        notification.title
-        )
-    )
 
-    user_generator = await db.scalar(
-        select(models.User).where(models.User.uuid == notification.user_generator)
-    )
+def _coalesce_key(notification) -> tuple:
+    return notification.user_receiver, notification.post_id, notification.event
 
-    if not user_generator:
-        logger.error("{} User to generate this notification does not exist".format(TAG))
-        raise Exception("User to generate this notification does not exist")
-    
-    user_receiver = await db.scalar(
-        select(models.User).where(models.User.uuid == notification.user_receiver)
+
+def _aggregate_message(notification: schemas.NotificationCreateRequest, count: int) -> str:
+    if count == 1:
+        return notification.content
+    others = "{} {}".format(count - 1, "pessoa" if count == 2 else "pessoas")
+    message = AGGREGATE_MESSAGES[notification.event].format(
+        actor=notification.actor_name, others=others, title=notification.post_title
     )
-    if not user_receiver:
-        logger.error("{} User to receive this notification does not exist".format(TAG))
-        raise Exception("User to receive this notification does not exist")
+    return message[:255]
+
+
+# Um evento por autor que ainda nao esta na notificacao, na ordem da ultima
+# ocorrencia: repeticoes (ex.: o mesmo usuario trocando de reacao) nao contam
+def _new_actor_events(events: list, known: set) -> list:
+    latest = {}
+    for event in events:
+        if event.user_generator not in known:
+            latest.pop(event.user_generator, None)
+            latest[event.user_generator] = event
+    return list(latest.values())
 
-    post_exists = await db.scalar(
-        select(models.Post).where(models.Post.uuid == notification.post_id)
+
+def _add_actors(db: AsyncSession, notification_id: uuid.UUID, events: list) -> None:
+    db.add_all(
+        models.NotificationActor(notification_id=notification_id, user_id=event.user_generator)
+        for event in events
     )
 
-    if not post_exists:
-        logger.error("{} Post does not exist".format(TAG))
-        raise Exception("Post does not exist")
-    
-    db_notification = models.Notification(
-        user_generator=user_generator.uuid,
-        user_receiver=user_receiver.uuid,
-        post_id=notification.post_id,
-        title=notification.title,
-        message=notification.content,
-        notification_type=notification_type_map.get(notification.notification_type, models.NotificationType.NEW)
+
+async def _coalesce_targets(db: AsyncSession, keys: set, since: datetime.datetime) -> dict:
+    result = await db.execute(
+        select(models.Notification).where(
+            models.Notification.user_receiver.in_({key[0] for key in keys}),
+            models.Notification.post_id.in_({key[1] for key in keys}),
+            models.Notification.event.in_({key[2] for key in keys}),
+            models.Notification.read == False,
+            models.Notification.deleted_at.is_(None),
+            models.Notification.created_at >= since
+        ).order_by(models.Notification.created_at)
     )
+    # A mais recente vence quando houver mais de uma na janela
+    return {
+        _coalesce_key(notification): notification
+        for notification in result.scalars()
+        if _coalesce_key(notification) in keys
+    }
 
-    db.add(db_notification)
-    await db.commit()
-    await db.refresh(db_notification)
 
-    logger.info("{} User {} successfully created a notification {}".format(
-        TAG, 
-        notification.user_generator, 
-        notification.title
-        )
+async def _known_actors(db: AsyncSession, notification_ids: list) -> dict[uuid.UUID, set]:
+    actors: dict[uuid.UUID, set] = {}
+    if not notification_ids:
+        return actors
+    result = await db.execute(
+        select(models.NotificationActor.notification_id, models.NotificationActor.user_id)
+        .where(models.NotificationActor.notification_id.in_(notification_ids))
     )
+    for notification_id, user_id in result.all():
+        actors.setdefault(notification_id, set()).add(user_id)
+    return actors
 
-    return db_notification
 
+# Grava um lote vindo da fila de notificacoes: valida geradores, destinatarios
+# e posts com duas consultas IN e insere os validos com um unico commit. Com
+# coalesce_window, eventos do mesmo (destinatario, post, evento) dentro da janela
+# atualizam uma unica notificacao nao lida em vez de criar outra; event_count
+# conta autores distintos, nao eventos.
+async def create_notifications(
+        db: AsyncSession,
+        notifications: list[schemas.NotificationCreateRequest],
+        coalesce_window: datetime.timedelta | None = None
+    ) -> int:
+    user_ids = {n.user_generator for n in notifications} | {n.user_receiver for n in notifications}
+    post_ids = {n.post_id for n in notifications}
+    existing_users = set(await db.scalars(select(models.User.uuid).where(models.User.uuid.in_(user_ids))))
+    existing_posts = set(await db.scalars(select(models.Post.uuid).where(models.Post.uuid.in_(post_ids))))
+
+    valid = [
+        n for n in notifications
+        if n.user_generator in existing_users
+        and n.user_receiver in existing_users
+        and n.post_id in existing_posts
+    ]
+    if len(valid) < len(notifications):
+        logger.error("{} Skipping {} notifications with missing user or post".format(
+            TAG, len(notifications) - len(valid)
+        ))
+
+    groups: dict[tuple, list[schemas.NotificationCreateRequest]] = {}
+    singles = []
+    for notification in valid:
+        if coalesce_window and notification.event:
+            groups.setdefault(_coalesce_key(notification), []).append(notification)
+        else:
+            singles.append([notification])
+
+    targets = {}
+    known_actors = {}
+    if groups:
+        targets = await _coalesce_targets(db, set(groups), datetime.datetime.utcnow() - coalesce_window)
+        known_actors = await _known_actors(db, [target.uuid for target in targets.values()])
+
+    updated = 0
+    for key, events in groups.items():
+        target = targets.get(key)
+        if target is None:
+            singles.append(_new_actor_events(events, set()))
+            continue
+        new_events = _new_actor_events(events, known_actors.get(target.uuid, set()))
+        if not new_events:
+            # So quem ja estava na notificacao repetiu o evento
+            continue
+        last = new_events[-1]
+        count = target.event_count + len(new_events)
+        target.event_count = count
+        target.user_generator = last.user_generator
+        target.message = _aggregate_message(last, count)
+        _add_actors(db, target.uuid, new_events)
+        updated += 1
+
+    unread_added: dict[uuid.UUID, int] = {}
+    for events in singles:
+        last = events[-1]
+        unread_added[last.user_receiver] = unread_added.get(last.user_receiver, 0) + 1
+        notification_id = uuid.uuid4()
+        db.add(models.Notification(
+            uuid=notification_id,
+            user_generator=last.user_generator,
+            user_receiver=last.user_receiver,
+            post_id=last.post_id,
+            title=last.title,
+            message=_aggregate_message(last, len(events)),
+            notification_type=NOTIFICATION_TYPES.get(last.notification_type, models.NotificationType.NEW),
+            event=last.event,
+            event_count=len(events)
+        ))
+        if last.event:
+            _add_actors(db, notification_id, events)
+    # Agregadas atualizadas ja estavam nao lidas; so linhas novas contam
+    for receiver, added in unread_added.items():
+        await user_stats_repository.apply_delta(db, receiver, unread_notifications=added)
+    await db.commit()
+    for receiver in unread_added:
+        unread_cache.invalidate(receiver)
+
+    logger.info("{} {} notifications created and {} updated from {} events".format(
+        TAG, len(singles), updated, len(valid)
+    ))
+    return len(valid)
 
-async def get_notifications(db: AsyncSession, user: models.User):
-    stmt = select(models.Notification).where(
+
+async def get_notifications(
+        db: AsyncSession,
+        user: models.User,
+        per_page: int,
+        after: tuple | None = None,
+        since: datetime.datetime | None = None
+    ) -> list[models.Notification]:
+    # updated_at ordena o feed: notificacoes agregadas voltam ao topo quando recebem eventos
+    filters = [
         models.Notification.user_receiver == user.uuid,
         models.Notification.deleted_at.is_(None),
-    ).order_by(models.Notification.created_at.desc())
+    ]
+    if since:
+        filters.append(models.Notification.updated_at > since)
+    if after:
+        filters.append(tuple_(models.Notification.updated_at, models.Notification.uuid) < tuple_(*after))
+
+    stmt = (
+        select(models.Notification)
+        .where(*filters)
+        .order_by(models.Notification.updated_at.desc(), models.Notification.uuid.desc())
+        .limit(per_page)
+    )
     result = await db.execute(stmt)
-    notifications = result.scalars().all()
-    for notification in notifications:
-        notification.read = True
-    
-    await db.commit()
-    return notifications
+    return result.scalars().all()
 
 
-async def get_notifications_count(db: AsyncSession, user: models.User):
-    stmt = select(func.count(models.Notification.uuid)).where(
+# Um unico UPDATE por chamada; updated_at e preservado para nao reordenar o feed
+async def mark_notifications_read(
+        db: AsyncSession,
+        user: models.User,
+        before: datetime.datetime | None = None,
+        uuids: list[uuid.UUID] | None = None
+    ) -> int:
+    stmt = update(models.Notification).where(
         models.Notification.user_receiver == user.uuid,
         models.Notification.deleted_at.is_(None),
         models.Notification.read == False
     )
-    result = await db.execute(stmt)
-    return result.scalar()
\ No newline at end of file
+    if uuids:
+        stmt = stmt.where(models.Notification.uuid.in_(uuids))
+    if before or not uuids:
+        stmt = stmt.where(models.Notification.updated_at <= (before or datetime.datetime.utcnow()))
+
+    result = await db.execute(stmt.values(read=True, updated_at=models.Notification.updated_at))
+    await user_stats_repository.apply_delta(db, user.uuid, unread_notifications=-result.rowcount)
+    await db.commit()
+    unread_cache.invalidate(user.uuid)
+    return result.rowcount
+
+
+# Contador mantido em user_stats junto com cada insercao e marcacao de leitura;
+# o polling e servido pelo unread_cache e, no miss, por uma busca pela chave primaria
+async def get_notifications_count(db: AsyncSession, user: models.User) -> int:
+    count = unread_cache.get(user.uuid)
+    if count is None:
+        stats = await user_stats_repository.get_user_stats(db, user.uuid)
+        count = stats.unread_notifications if stats else 0
+        unread_cache.set(user.uuid, count)
+    return count
+
+
+async def get_unread_counts(db: AsyncSession, user_ids: set[uuid.UUID]) -> dict[uuid.UUID, int]:
+    result = await db.execute(
+        select(models.UserStats.user_id, models.UserStats.unread_notifications)
+        .where(models.UserStats.user_id.in_(user_ids))
+    )
+    counts = {user_id: 0 for user_id in user_ids}
+    counts.update(result.all())
+    for user_id, count in counts.items():
+        unread_cache.set(user_id, count)
+    return counts
@@ -1,30 +1,60 @@
+import os
+import re
+import html
+import unicodedata
 import models
 import uuid
 from singleton.log import logger
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import or_, exists, func, and_, select
+from sqlalchemy import or_, exists, func, and_, select, tuple_, table, column, literal_column, cast, insert, String
 from sqlalchemy.future import select
 from api import schemas
+from repository import tag_repository, user_stats_repository
+from singleton.cache import tag_catalog, search_cache
+from services.reaction_counter_service import reaction_buffer
 
 TAG = " Post Repository -> "
+SEARCH_CONFIG = "portuguese"
+# O banco marca os trechos com caracteres de controle; o HTML (<mark>) so e
+# montado depois de escapar o conteudo do post, em _highlight
+SNIPPET_START = "\x02"
+SNIPPET_END = "\x03"
+# O ts_headline troca tags HTML por espaco; o "<" vai trocado por este caractere
+# e volta em _highlight, antes do escape
+SNIPPET_TAG_OPEN = "\x04"
+# A relevancia so e calculada sobre no maximo N posts: no SQLite, termos que
+# casam com N posts ou mais sao listados por recencia; no PostgreSQL, o ranking
+# considera so os N mais recentes que casam
+SEARCH_RANK_CANDIDATES = int(os.getenv("SEARCH_RANK_CANDIDATES", "1000"))
+# Maior tamanho do indice de prefixo do posts_fts (prefix='2 3 4'); prefixos
+# maiores sao expandidos em ate SEARCH_PREFIX_TERMS termos pelo posts_fts_vocab
+SEARCH_PREFIX_INDEXED = 4
+SEARCH_PREFIX_TERMS = int(os.getenv("SEARCH_PREFIX_TERMS", "32"))
 
 
 async def create_post(
         db: AsyncSession, 
         post: schemas.PostCreateRequest, 
         user: models.User,
-        tags: list[models.Tag]
+        tag_ids: list[uuid.UUID]
     ) -> models.Post:
     logger.info("{} User {} are trying to create a post {}".format(TAG, user.username, post.title))
     
     db_post = models.Post(
         title=post.title,
         content=post.content,
-        user=user
+        user_id=user.uuid
     )
-    db_post.tags = tags
-    
     db.add(db_post)
+    await db.flush()
+    # Tags ja validadas no catalogo: grava so a associacao, sem carregar models.Tag
+    await db.execute(
+        insert(models.post_tags),
+        [{"post_id": db_post.uuid, "tag_id": tag_id} for tag_id in tag_ids]
+    )
+    await user_stats_repository.apply_delta(
+        db, user.uuid, last_post_date=db_post.created_at, post_count=1
+    )
     await db.commit()
     await db.refresh(db_post)
     
@@ -32,17 +62,8 @@ async def create_post(
     return db_post
 
 
-async def get_posts_preview(
-        db: AsyncSession, 
-        user: models.User, 
-        page: int = 1, 
-        per_page: int = 10, 
-        search: str = None, 
-        offset: int = 0,
-        bookmarked: bool = False,
-        visiting_uuid: str = None
-    ) -> list[schemas.PostPreview]:
-    
+# Estado do post para o usuario da request (bookmark e reacao)
+def _viewer_columns(user: models.User) -> tuple:
     is_bookmarked = (
         exists()
         .where(
@@ -66,26 +87,32 @@ async def get_posts_preview(
         .scalar_subquery()
         .label("user_reaction")
     )
+    return is_bookmarked, user_reaction
 
-    stmt = (
+
+def _preview_stmt(user: models.User, page_subq, *extra_columns):
+    is_bookmarked, user_reaction = _viewer_columns(user)
+
+    return (
         select(
             models.Post.uuid,
             models.Post.title,
             models.Post.content,
             models.User.username,
             models.Post.created_at,
+            models.Post.updated_at,
             is_bookmarked,
             user_reaction, 
-            func.group_concat(models.Tag.name, ',').label("tag_names"),
-            func.group_concat(models.Tag.color, ',').label("tag_colors"),
+            func.aggregate_strings(cast(models.post_tags.c.tag_id, String), ',').label("tag_ids"),
             models.PostReactionCount.love,
             models.PostReactionCount.like,
             models.PostReactionCount.support,
-            models.PostReactionCount.sad
+            models.PostReactionCount.sad,
+            *extra_columns
         )
+        .join(page_subq, page_subq.c.uuid == models.Post.uuid)
         .join(models.User, models.Post.user_id == models.User.uuid)
         .outerjoin(models.post_tags, models.post_tags.c.post_id == models.Post.uuid)
-        .outerjoin(models.Tag, models.post_tags.c.tag_id == models.Tag.uuid)
         .outerjoin(
             models.PostReactionCount, 
             models.PostReactionCount.post_id == models.Post.uuid
@@ -96,88 +123,408 @@ async def get_posts_preview(
             models.Post.content,
             models.User.username,
             models.Post.created_at,
+            models.Post.updated_at,
+            models.PostReactionCount.love,
+            models.PostReactionCount.like,
+            models.PostReactionCount.support,
+            models.PostReactionCount.sad,
+            *extra_columns
+        )
+    )
+
+
+# Nome e cor vem do catalogo em memoria; a consulta traz so os uuids das tags
+def _row_tags(row) -> list[dict]:
+    if not row.tag_ids:
+        return []
+    return tag_catalog.previews(uuid.UUID(tag_id) for tag_id in row.tag_ids.split(','))
+
+
+def _row_reactions(row) -> dict:
+    return {
+        **reaction_buffer.overlay(row.uuid, {
+            "love": row.love or 0,
+            "like": row.like or 0,
+            "support": row.support or 0,
+            "sad": row.sad or 0,
+        }),
+        "user_reaction": row.user_reaction.value if row.user_reaction else None
+    }
+
+
+# created_at fica como datetime; a formatacao e do schema (ou de api/responses)
+def _format_preview_row(row) -> dict:
+    return {
+        "uuid": str(row.uuid),
+        "title": row.title,
+        "content": row.content,
+        "username": row.username,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+        "is_bookmarked": row.is_bookmarked,
+        "tags": _row_tags(row),
+        "reactions": _row_reactions(row)
+    }
+
+
+# Mesmas colunas que mudam o conteudo de um preview, sem titulo, texto nem tags
+# (que nao mudam sem mudar updated_at); base dos ETags do feed e do detalhe
+def _version_stmt(user: models.User):
+    is_bookmarked, user_reaction = _viewer_columns(user)
+    return (
+        select(
+            models.Post.uuid,
+            models.Post.created_at,
+            models.Post.updated_at,
+            models.User.username,
+            is_bookmarked,
+            user_reaction,
             models.PostReactionCount.love,
             models.PostReactionCount.like,
             models.PostReactionCount.support,
             models.PostReactionCount.sad
         )
+        .join(models.User, models.Post.user_id == models.User.uuid)
+        .outerjoin(
+            models.PostReactionCount,
+            models.PostReactionCount.post_id == models.Post.uuid
+        )
     )
-    if visiting_uuid:
-        stmt = stmt.where(models.Post.user_id == visiting_uuid)
 
-    # Filtro de busca
-    if search:
-        search_pattern = f"%{search}%"
-        stmt = stmt.where(
-            or_(
-                models.Post.title.ilike(search_pattern),
-                models.Post.content.ilike(search_pattern)
+
+def _format_version_row(row) -> dict:
+    return {
+        "uuid": str(row.uuid),
+        "created_at": row.created_at,
+        "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+        "username": row.username,
+        "is_bookmarked": row.is_bookmarked,
+        "reactions": _row_reactions(row)
+    }
+
+
+# Aceita tanto os dicts completos quanto os de _format_version_row. Usa o etag
+# do catalogo (hash do conteudo), que e igual em todos os workers e restarts
+def posts_version(posts: list[dict]) -> tuple:
+    return (tag_catalog.etag, *(
+        (
+            post["uuid"],
+            post["updated_at"],
+            post["username"],
+            post["is_bookmarked"],
+            *post["reactions"].values()
+        )
+        for post in posts
+    ))
+
+
+def _search_filter(search: str):
+    search_pattern = f"%{search}%"
+    return or_(
+        models.Post.title.ilike(search_pattern),
+        models.Post.content.ilike(search_pattern)
+    )
+
+
+def _highlight(snippet: str | None) -> str | None:
+    if snippet is None:
+        return None
+    snippet = snippet.replace(SNIPPET_TAG_OPEN, "<")
+    return html.escape(snippet).replace(SNIPPET_START, "<mark>").replace(SNIPPET_END, "</mark>")
+
+
+# Mesma normalizacao do tokenizer (unicode61 remove_diacritics 2), para
+# comparar o termo digitado com o dicionario do indice
+def _fold_term(term: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", term.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+# O FTS5 so le o doclist sob demanda para termos exatos e prefixos do indice;
+# um prefixo maior e materializado juntando o doclist de todo termo que comeca
+# com ele antes da primeira linha (centenas de ms num prefixo comum numa base
+# de 1M posts). Os termos sao listados pelo posts_fts_vocab e a busca vira um
+# OR de termos exatos, lido sob demanda
+async def _prefix_phrase(db: AsyncSession, prefix: str) -> str:
+    phrase = '"{}"*'.format(prefix)
+    if len(prefix) <= SEARCH_PREFIX_INDEXED:
+        return phrase
+
+    folded = _fold_term(prefix)
+    cached = search_cache.get(("prefix", folded))
+    if cached is not None:
+        return cached
+    vocab = table("posts_fts_vocab", column("term"))
+
+    # term >= anterior || char(1) salta para o proximo termo; com "term >" o
+    # fts5vocab percorre todas as ocorrencias do termo anterior
+    def next_term(after):
+        return (
+            select(vocab.c.term)
+            .where(vocab.c.term >= after, vocab.c.term < folded + "\U0010ffff")
+            .limit(1)
+            .scalar_subquery()
+        )
+
+    terms = select(next_term(folded).label("term"), literal_column("1").label("position")).cte(
+        "prefix_terms", recursive=True
+    )
+    terms = terms.union_all(
+        select(next_term(terms.c.term + "\x01"), terms.c.position + 1)
+        .where(terms.c.term.is_not(None), terms.c.position < SEARCH_PREFIX_TERMS)
+    )
+    result = await db.execute(select(terms.c.term).where(terms.c.term.is_not(None)))
+    expanded = result.scalars().all()
+    # Sem termos a busca nao casa com nada; com termos demais o OR nao compensa
+    if expanded and len(expanded) < SEARCH_PREFIX_TERMS:
+        phrase = "({})".format(" OR ".join('"{}"'.format(term) for term in expanded))
+    search_cache.set(("prefix", folded), phrase)
+    return phrase
+
+
+# bm25 calcula o IDF de cada frase percorrendo o doclist inteiro dela, o que
+# numa base grande custa mais que o ILIKE para termos comuns. Conta os posts de
+# cada frase so ate o limite: o FTS5 le o doclist sob demanda
+async def _has_frequent_phrase(db: AsyncSession, phrases: list[str]) -> bool:
+    counts = [
+        select(func.count()).select_from(
+            select(literal_column("1"))
+            .select_from(table("posts_fts"))
+            .where(literal_column("posts_fts").op("MATCH")(phrase))
+            .limit(SEARCH_RANK_CANDIDATES)
+            .subquery()
+        ).scalar_subquery()
+        for phrase in phrases
+    ]
+    result = await db.execute(select(*counts))
+    return max(result.one()) >= SEARCH_RANK_CANDIDATES
+
+
+# Busca textual indexada: FTS5 (bm25 + snippet) no SQLite e tsvector/GIN
+# (ts_rank + ts_headline) no PostgreSQL. Retorna a consulta da pagina ja
+# ordenada (uuid, search_rank) e uma fabrica da coluna de snippet, ou None
+# quando o banco nao tem indice textual. Menor search_rank = mais relevante.
+async def _ranked_search(db: AsyncSession, search: str, visiting_uuid=None):
+    terms = re.findall(r"\w+", search)
+    if not terms:
+        return None
+    # So o ultimo termo (o que esta sendo digitado) casa por prefixo
+    *words, last = terms
+
+    dialect = db.bind.dialect.name
+    if dialect == "sqlite":
+        fts = literal_column("posts_fts")
+        fts_rowid = literal_column("posts_fts.rowid")
+        phrases = ['"{}"'.format(word) for word in words] + [await _prefix_phrase(db, last)]
+        match = " AND ".join(phrases)
+        page_stmt = (
+            select(models.Post.uuid)
+            .select_from(table("posts_fts"))
+            .join(models.Post, literal_column("posts.search_id") == fts_rowid)
+            .where(fts.op("MATCH")(match))
+        )
+        if visiting_uuid:
+            page_stmt = page_stmt.where(models.Post.user_id == visiting_uuid)
+
+        frequent = search_cache.get(("frequent", match))
+        if frequent is None:
+            frequent = await _has_frequent_phrase(db, phrases)
+            search_cache.set(("frequent", match), frequent)
+        if frequent:
+            # Termo frequente: mais recentes primeiro. O FTS5 entrega o doclist
+            # em ordem de rowid e para no LIMIT; o snippet sai do mesmo cursor,
+            # so para as linhas da pagina, sem expandir o MATCH de novo
+            snippet = func.snippet(fts, -1, SNIPPET_START, SNIPPET_END, "...", 16).label("snippet")
+            page_stmt = page_stmt.add_columns((-fts_rowid).label("search_rank"), snippet)
+            return page_stmt.order_by(fts_rowid.desc()), lambda page_subq: page_subq.c.snippet
+
+        # Todas as frases sao raras: o bm25 pontua no maximo
+        # SEARCH_RANK_CANDIDATES posts. O desempate e pelo rowid do indice:
+        # created_at fica depois do content e obrigaria a ler o post inteiro
+        rank = func.bm25(fts).label("search_rank")
+        page_stmt = page_stmt.add_columns(rank, fts_rowid.label("fts_rowid")).order_by(rank, fts_rowid.desc())
+
+        # snippet() na consulta ranqueada rodaria para todo post que casa antes
+        # do LIMIT; aqui e uma subconsulta por rowid so para as linhas da pagina
+        def snippet(page_subq):
+            return (
+                select(func.snippet(fts, -1, SNIPPET_START, SNIPPET_END, "...", 16))
+                .select_from(table("posts_fts"))
+                .where(fts.op("MATCH")(match), fts_rowid == page_subq.c.fts_rowid)
+                .scalar_subquery()
+                .label("snippet")
             )
+        return page_stmt, snippet
+
+    if dialect == "postgresql":
+        document = func.to_tsvector(SEARCH_CONFIG, models.Post.title + " " + models.Post.content)
+        query = func.to_tsquery(SEARCH_CONFIG, " & ".join(words + ["{}:*".format(last)]))
+        rank = (-func.ts_rank(document, query)).label("search_rank")
+        # Relevancia so entre os candidatos mais recentes, restritos ao autor
+        # visitado antes do limite
+        candidates = select(models.Post.uuid).where(document.op("@@")(query))
+        if visiting_uuid:
+            candidates = candidates.where(models.Post.user_id == visiting_uuid)
+        candidates = candidates.order_by(models.Post.created_at.desc()).limit(SEARCH_RANK_CANDIDATES)
+        page_stmt = select(models.Post.uuid, rank).where(models.Post.uuid.in_(candidates)).order_by(
+            rank, models.Post.created_at.desc(), models.Post.uuid.desc()
         )
-    
-    stmt = stmt.offset(offset).limit(per_page)
+        # ts_headline e caro; calculado so para as linhas da pagina
+        snippet = func.ts_headline(
+            SEARCH_CONFIG,
+            func.replace(models.Post.content, "<", SNIPPET_TAG_OPEN),
+            query,
+            "StartSel={}, StopSel={}, MaxWords=16, MinWords=8".format(SNIPPET_START, SNIPPET_END)
+        ).label("snippet")
+        return page_stmt, lambda page_subq: snippet
+
+    return None
+
+
+# Seleciona primeiro apenas os uuids da pagina, em ordem estavel, direto do
+# indice (created_at, uuid); joins e agregacoes rodam so para essas linhas
+def _feed_page(per_page: int, search: str | None, offset: int, visiting_uuid, after: tuple | None):
+    page_stmt = select(models.Post.uuid)
+    if visiting_uuid:
+        page_stmt = page_stmt.where(models.Post.user_id == visiting_uuid)
+
+    # Filtro de busca (bancos sem indice textual)
+    if search:
+        page_stmt = page_stmt.where(_search_filter(search))
+
+    page_stmt = page_stmt.order_by(models.Post.created_at.desc(), models.Post.uuid.desc())
+    if after:
+        page_stmt = page_stmt.where(tuple_(models.Post.created_at, models.Post.uuid) < tuple_(*after))
+    else:
+        page_stmt = page_stmt.offset(offset)
+    return page_stmt.limit(per_page).subquery()
+
+
+async def get_posts_preview(
+        db: AsyncSession, 
+        user: models.User, 
+        page: int = 1, 
+        per_page: int = 10, 
+        search: str = None, 
+        offset: int = 0,
+        visiting_uuid: str = None,
+        after: tuple | None = None
+    ) -> list[schemas.PostPreview]:
+    await tag_repository.refresh_tag_catalog(db)
+
+    ranked = await _ranked_search(db, search, visiting_uuid) if search else None
+    if ranked:
+        # Busca ordenada por relevancia (ou recencia, para termos frequentes);
+        # pagina por offset
+        page_stmt, snippet_column = ranked
+        page_subq = page_stmt.offset(offset).limit(per_page).subquery()
+
+        stmt = _preview_stmt(
+            user,
+            page_subq,
+            page_subq.c.search_rank,
+            snippet_column(page_subq)
+        ).order_by(page_subq.c.search_rank, models.Post.created_at.desc(), models.Post.uuid.desc())
+
+        result = await db.execute(stmt)
+        formatted_posts = []
+        for row in result.all():
+            post = _format_preview_row(row)
+            post["snippet"] = _highlight(row.snippet)
+            formatted_posts.append(post)
+        return formatted_posts
+
+    page_subq = _feed_page(per_page, search, offset, visiting_uuid, after)
+    stmt = _preview_stmt(user, page_subq).order_by(
+        models.Post.created_at.desc(),
+        models.Post.uuid.desc()
+    )
     
     result = await db.execute(stmt)
-    rows = result.all()
-    
-    formatted_posts = []
-    for row in rows:
-
-        tag_names = row.tag_names.split(',') if row.tag_names else []
-        tag_colors = row.tag_colors.split(',') if row.tag_colors else []
-
-        tags = [
-            {"name": name, "color": color}
-            for name, color in zip(tag_names, tag_colors)
-        ]
-        if bookmarked and not row.is_bookmarked:
-            continue
-
-        formatted_posts.append({
-            "uuid": str(row.uuid),
-            "title": row.title,
-            "content": row.content,
-            "username": row.username,
-            "created_at": row.created_at.isoformat(),
-            "is_bookmarked": row.is_bookmarked,
-            "tags": tags,
-            "reactions": {
-                "love": row.love or 0,
-                "like": row.like or 0,
-                "support": row.support or 0,
-                "sad": row.sad or 0,
-                "user_reaction": row.user_reaction
-            }
-        })
+    return [_format_preview_row(row) for row in result.all()]
 
-    return formatted_posts
 
+# Versoes da mesma pagina de get_posts_preview (sem busca ranqueada), para
+# responder requisicoes condicionais sem montar o feed
+async def get_posts_preview_versions(
+        db: AsyncSession,
+        user: models.User,
+        per_page: int = 10,
+        offset: int = 0,
+        visiting_uuid: str = None,
+        after: tuple | None = None
+    ) -> list[dict]:
+    await tag_repository.refresh_tag_catalog(db)
+    page_subq = _feed_page(per_page, None, offset, visiting_uuid, after)
+    stmt = (
+        _version_stmt(user)
+        .join(page_subq, page_subq.c.uuid == models.Post.uuid)
+        .order_by(models.Post.created_at.desc(), models.Post.uuid.desc())
+    )
+    result = await db.execute(stmt)
+    return [_format_version_row(row) for row in result.all()]
 
-async def get_post_detail(db: AsyncSession,user: models.User,post_uuid: uuid.UUID) -> schemas.PostDetail: 
-    is_bookmarked = (
-        exists()
+
+async def get_bookmarked_posts_preview(
+        db: AsyncSession,
+        user: models.User,
+        per_page: int = 10,
+        search: str = None,
+        offset: int = 0,
+        after: tuple | None = None
+    ) -> list[schemas.PostPreview]:
+    await tag_repository.refresh_tag_catalog(db)
+
+    # A pagina parte dos bookmarks do usuario (indice user_id, created_at, uuid),
+    # ordenada pela data do bookmark; so depois junta com os posts da pagina
+    page_stmt = (
+        select(
+            models.PostBookmark.post_id.label("uuid"),
+            models.PostBookmark.created_at.label("bookmarked_at"),
+            models.PostBookmark.uuid.label("bookmark_uuid")
+        )
         .where(
-            and_(
-                models.PostBookmark.post_id == models.Post.uuid,
-                models.PostBookmark.user_id == user.uuid,
-                models.PostBookmark.deleted_at.is_(None)
-            )
+            models.PostBookmark.user_id == user.uuid,
+            models.PostBookmark.deleted_at.is_(None)
         )
-        .label("is_bookmarked")
     )
+    if search:
+        page_stmt = (
+            page_stmt
+            .join(models.Post, models.Post.uuid == models.PostBookmark.post_id)
+            .where(_search_filter(search))
+        )
 
-    user_reaction = (
-        select(models.PostReaction.reaction_type)
-        .where(
-            and_(
-                models.PostReaction.post_id == models.Post.uuid,
-                models.PostReaction.user_id == user.uuid
-            )
+    page_stmt = page_stmt.order_by(models.PostBookmark.created_at.desc(), models.PostBookmark.uuid.desc())
+    if after:
+        page_stmt = page_stmt.where(
+            tuple_(models.PostBookmark.created_at, models.PostBookmark.uuid) < tuple_(*after)
         )
-        .limit(1)
-        .scalar_subquery()
-        .label("user_reaction")
-    )
+    else:
+        page_stmt = page_stmt.offset(offset)
+    page_subq = page_stmt.limit(per_page).subquery()
+
+    stmt = _preview_stmt(
+        user,
+        page_subq,
+        page_subq.c.bookmarked_at,
+        page_subq.c.bookmark_uuid
+    ).order_by(page_subq.c.bookmarked_at.desc(), page_subq.c.bookmark_uuid.desc())
+
+    result = await db.execute(stmt)
+    formatted_posts = []
+    for row in result.all():
+        post = _format_preview_row(row)
+        post["bookmarked_at"] = row.bookmarked_at.isoformat()
+        post["bookmark_uuid"] = str(row.bookmark_uuid)
+        formatted_posts.append(post)
+
+    return formatted_posts
+
+
+async def get_post_detail(db: AsyncSession,user: models.User,post_uuid: uuid.UUID) -> schemas.PostDetail: 
+    await tag_repository.refresh_tag_catalog(db)
+    is_bookmarked, user_reaction = _viewer_columns(user)
 
     stmt = (
         select(
@@ -186,10 +533,10 @@ async def get_post_detail(db: AsyncSession,user: models.User,post_uuid: uuid.UUI
             models.Post.content,
             models.User.username,
             models.Post.created_at,
+            models.Post.updated_at,
             is_bookmarked,
             user_reaction,
-            func.group_concat(models.Tag.name, ',').label("tag_names"),
-            func.group_concat(models.Tag.color, ',').label("tag_colors"),
+            func.aggregate_strings(cast(models.post_tags.c.tag_id, String), ',').label("tag_ids"),
             models.PostReactionCount.love,
             models.PostReactionCount.like,
             models.PostReactionCount.support,
@@ -197,7 +544,6 @@ async def get_post_detail(db: AsyncSession,user: models.User,post_uuid: uuid.UUI
         )
         .join(models.User, models.Post.user_id == models.User.uuid)
         .outerjoin(models.post_tags, models.post_tags.c.post_id == models.Post.uuid)
-        .outerjoin(models.Tag, models.post_tags.c.tag_id == models.Tag.uuid)
         .outerjoin(
             models.PostReactionCount, 
             models.PostReactionCount.post_id == models.Post.uuid
@@ -209,6 +555,7 @@ async def get_post_detail(db: AsyncSession,user: models.User,post_uuid: uuid.UUI
             models.Post.content,
             models.User.username,
             models.Post.created_at,
+            models.Post.updated_at,
             models.PostReactionCount.love,
             models.PostReactionCount.like,
             models.PostReactionCount.support,
@@ -220,30 +567,14 @@ async def get_post_detail(db: AsyncSession,user: models.User,post_uuid: uuid.UUI
     row = result.first()
     if not row:
         return None
-    
-    tag_names = row.tag_names.split(',') if row.tag_names else []
-    tag_colors = row.tag_colors.split(',') if row.tag_colors else []
-    
-    tags = [
-        {"name": name, "color": color}
-        for name, color in zip(tag_names, tag_colors)
-    ]
-    return {
-        "uuid": str(row.uuid),
-        "title": row.title,
-        "content": row.content,
-        "username": row.username,
-        "created_at": row.created_at.isoformat(),
-        "is_bookmarked": row.is_bookmarked,
-        "tags": tags,
-        "reactions": {
-            "love": row.love or 0,
-            "like": row.like or 0,
-            "support": row.support or 0,
-            "sad": row.sad or 0,
-            "user_reaction": row.user_reaction
-        }
-    }
+    return _format_preview_row(row)
+
+
+async def get_post_detail_version(db: AsyncSession, user: models.User, post_uuid: uuid.UUID) -> dict | None:
+    await tag_repository.refresh_tag_catalog(db)
+    result = await db.execute(_version_stmt(user).where(models.Post.uuid == post_uuid))
+    row = result.first()
+    return _format_version_row(row) if row else None
 
 
 async def post_bookmark(db: AsyncSession, db_post: models.Post, user: models.User) -> bool:
@@ -262,11 +593,13 @@ async def post_bookmark(db: AsyncSession, db_post: models.Post, user: models.Use
     
     if db_bookmark:
         await db.delete(db_bookmark)
+        await user_stats_repository.apply_delta(db, db_post.user_id, bookmarks_received=-1)
         await db.commit()
         response = False
     else:
         new_bookmark = models.PostBookmark(post_id=db_post.uuid, user_id=user.uuid)
         db.add(new_bookmark)
+        await user_stats_repository.apply_delta(db, db_post.user_id, bookmarks_received=1)
         await db.commit()
         await db.refresh(new_bookmark)
         response = True
@@ -277,11 +610,6 @@ async def post_bookmark(db: AsyncSession, db_post: models.Post, user: models.Use
     return response
 
 
-async def post_count_by_user(db: AsyncSession, user: models.User):
-    stmt = select(func.count(models.Post.uuid)).where(models.Post.user_id == user.uuid)
-    result = await db.execute(stmt)
-    return result.scalar()
-
 async def post_reaction(db: AsyncSession, db_post: models.Post, user: models.User, reaction: str) -> bool:
     logger.info("{} User {} are trying to react a post {}".format(TAG, user.username, db_post.title))
 
@@ -1,22 +1,125 @@
 import models
 from singleton.log import logger
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import and_, select, func
-from sqlalchemy.future import select
-from services import notification_service
+from sqlalchemy import select, update
+from database import dialect_insert
+from services.reaction_counter_service import reaction_buffer
+from repository import user_stats_repository
 
 TAG = "Reaction Repository -> "
 
 
+REACTION_COUNTERS = {
+    models.ReactionType.LOVE.name: "love",
+    models.ReactionType.LIKE.name: "like",
+    models.ReactionType.SUPPORT.name: "support",
+    models.ReactionType.SAD.name: "sad",
+}
+
+
+def _empty_counts() -> dict:
+    return {column: 0 for column in REACTION_COUNTERS.values()}
+
+
+# Troca (ou cria) a reacao do usuario e ajusta os contadores com UPDATE relativo,
+# tudo na mesma transacao. O upsert na linha de contadores vem primeiro para
+# serializar reacoes concorrentes no mesmo post antes de ler a reacao anterior.
+# Devolve os contadores e se a reacao mudou.
+async def _write_reaction(db: AsyncSession, post: models.Post, user: models.User, reaction: str) -> tuple[dict, bool]:
+    counts_table = models.PostReactionCount.__table__
+    reactions_table = models.PostReaction.__table__
+
+    lock_counts = dialect_insert(db, counts_table).values(post_id=post.uuid, **_empty_counts())
+    await db.execute(lock_counts.on_conflict_do_update(
+        index_elements=[counts_table.c.post_id],
+        set_={"post_id": lock_counts.excluded.post_id}
+    ))
+
+    previous = (await db.execute(
+        select(reactions_table.c.reaction_type).where(
+            reactions_table.c.user_id == user.uuid,
+            reactions_table.c.post_id == post.uuid
+        )
+    )).scalar_one_or_none()
+
+    counters = [counts_table.c[column] for column in REACTION_COUNTERS.values()]
+    changed = previous is None or previous.name != reaction
+    if not changed:
+        # Mesma reacao repetida: nada muda
+        result = await db.execute(select(*counters).where(counts_table.c.post_id == post.uuid))
+    else:
+        upsert_reaction = dialect_insert(db, reactions_table).values(
+            user_id=user.uuid,
+            post_id=post.uuid,
+            reaction_type=reaction
+        )
+        await db.execute(upsert_reaction.on_conflict_do_update(
+            index_elements=[reactions_table.c.user_id, reactions_table.c.post_id],
+            set_={"reaction_type": upsert_reaction.excluded.reaction_type}
+        ))
+
+        deltas = {reaction: 1}
+        if previous is not None:
+            deltas[previous.name] = -1
+        result = await db.execute(
+            update(counts_table)
+            .where(counts_table.c.post_id == post.uuid)
+            .values({
+                REACTION_COUNTERS[name]: counts_table.c[REACTION_COUNTERS[name]] + delta
+                for name, delta in deltas.items()
+            })
+            .returning(*counters)
+        )
+        await user_stats_repository.apply_delta(db, post.user_id, **{
+            user_stats_repository.reaction_column(name): delta for name, delta in deltas.items()
+        })
+    counts = dict(result.one()._mapping)
+    await db.commit()
+    return counts, changed
+
+
+# Com o buffer ligado so a linha da reacao e gravada aqui; o delta dos contadores
+# vai para o reaction_buffer. O INSERT ... ON CONFLICT DO NOTHING cria a reacao
+# nova; se ela ja existe, a linha e travada com FOR UPDATE antes de ler a reacao
+# anterior, entao toques concorrentes do mesmo usuario nao disputam a chave
+async def _buffered_reaction(db: AsyncSession, post: models.Post, user: models.User, reaction: str) -> tuple[dict, bool]:
+    counts_table = models.PostReactionCount.__table__
+    reactions_table = models.PostReaction.__table__
+    same_reaction = (reactions_table.c.user_id == user.uuid, reactions_table.c.post_id == post.uuid)
+
+    insert_reaction = dialect_insert(db, reactions_table).values(
+        user_id=user.uuid,
+        post_id=post.uuid,
+        reaction_type=reaction
+    )
+    inserted = await db.execute(
+        insert_reaction.on_conflict_do_nothing().returning(reactions_table.c.post_id)
+    )
+    previous = None
+    if inserted.one_or_none() is None:
+        previous = (await db.execute(
+            select(reactions_table.c.reaction_type).where(*same_reaction).with_for_update()
+        )).scalar_one()
+        if previous.name != reaction:
+            await db.execute(update(reactions_table).where(*same_reaction).values(reaction_type=reaction))
+
+    counters = [counts_table.c[column] for column in REACTION_COUNTERS.values()]
+    row = (await db.execute(select(*counters).where(counts_table.c.post_id == post.uuid))).one_or_none()
+    await db.commit()
+
+    changed = previous is None or previous.name != reaction
+    if changed:
+        deltas = {REACTION_COUNTERS[reaction]: 1}
+        if previous is not None:
+            deltas[REACTION_COUNTERS[previous.name]] = -1
+        reaction_buffer.add(post.uuid, post.user_id, deltas)
+
+    counts = dict(row._mapping) if row else _empty_counts()
+    return reaction_buffer.overlay(post.uuid, counts), changed
+
+
 async def create_post_reaction(db: AsyncSession, post: models.Post, user:models.User, raw_reaction:str):
-    enum_map = {
-        "love": models.ReactionType.LOVE.name,
-        "like": models.ReactionType.LIKE.name,
-        "support": models.ReactionType.SUPPORT.name,
-        "sad": models.ReactionType.SAD.name
-    }
-    
-    reaction = enum_map[raw_reaction]
+    reaction = models.ReactionType(raw_reaction).name
     logger.info("{} User: {} reacted post: {} with: {}".format(
         TAG, 
         user.username, 
@@ -25,90 +128,18 @@ async def create_post_reaction(db: AsyncSession, post: models.Post, user:models.
         )
     )
     try:
-        existing_reaction = await db.execute(
-            select(models.PostReaction)
-            .where(
-                and_(
-                    models.PostReaction.user_id == user.uuid,
-                    models.PostReaction.post_id == post.uuid
-                )
-            )
-        )
-        existing_reaction = existing_reaction.scalar_one_or_none()
-        reaction_counts = await db.execute(
-            select(models.PostReactionCount)
-            .where(models.PostReactionCount.post_id == post.uuid)
-        )
-        reaction_counts = reaction_counts.scalar_one_or_none()
-    except Exception as e:
-        await db.rollback()
-        logger.error("%s Error while restoring react information: %s", TAG, str(e))
-        return {
-            "status":"error",
-            "message": str(e),
-            "reaction": reaction,
-            "counts": {
-                "love": 0,
-                "like": 0,
-                "support": 0,
-                "sad": 0
-            }
-        }
-    
-    try:
-        if not reaction_counts:
-            reaction_counts = models.PostReactionCount(
-                post_id=post.uuid,
-                love=0,
-                like=0,
-                support=0,
-                sad=0
-            )
-            db.add(reaction_counts) 
-        if existing_reaction:
-            if existing_reaction.reaction_type == models.ReactionType.LOVE and reaction_counts.love > 0:
-                reaction_counts.love -= 1
-            elif existing_reaction.reaction_type == models.ReactionType.LIKE and reaction_counts.like > 0:
-                reaction_counts.like -= 1
-            elif existing_reaction.reaction_type == models.ReactionType.SUPPORT and reaction_counts.support > 0:
-                reaction_counts.support -= 1
-            elif existing_reaction.reaction_type == models.ReactionType.SAD and reaction_counts.sad > 0:
-                reaction_counts.sad -= 1
-            
-            existing_reaction.reaction_type = reaction
+        if reaction_buffer.enabled:
+            counts, changed = await _buffered_reaction(db, post, user, reaction)
         else:
-            new_reaction = models.PostReaction(
-                user_id=user.uuid,
-                post_id=post.uuid,
-                reaction_type=reaction
-            )
-            db.add(new_reaction)
-        
-        if reaction == models.ReactionType.LOVE.name:
-            reaction_counts.love += 1
-        elif reaction == models.ReactionType.LIKE.name:
-            reaction_counts.like += 1
-        elif reaction == models.ReactionType.SUPPORT.name:
-            reaction_counts.support += 1
-        elif reaction == models.ReactionType.SAD.name:
-            reaction_counts.sad += 1
-        
-        await db.commit()
-        
-        await db.refresh(reaction_counts)
-        if existing_reaction:
-            await db.refresh(existing_reaction)
-        
+            counts, changed = await _write_reaction(db, post, user, reaction)
+
+        # Repetir a mesma reacao nao muda nada (nem gera notificacao)
         return {
             "status": "success",
-            "message": "Reaction created successfully",
+            "message": "Reaction created successfully" if changed else "Reaction unchanged",
             "reaction": reaction,
-            "counts": {
-                "love": reaction_counts.love,
-                "like": reaction_counts.like,
-                "support": reaction_counts.support,
-                "sad": reaction_counts.sad
-            }
+            "changed": changed,
+            "counts": counts
         }
     
     except Exception as e:
@@ -118,24 +149,6 @@ async def create_post_reaction(db: AsyncSession, post: models.Post, user:models.
             "status":"error",
             "message": str(e),
             "reaction": reaction,
-            "counts": {
-                "love": 0,
-                "like": 0,
-                "support": 0,
-                "sad": 0
-            }
+            "changed": False,
+            "counts": _empty_counts()
         }
-
-
-async def get_user_reactions_count_by_type(db: AsyncSession, user: models.User) -> dict:
-    stmt = select(
-        models.PostReaction.reaction_type,
-        func.count().label('count')
-    ).where(
-        models.PostReaction.user_id == user.uuid
-    ).group_by(
-        models.PostReaction.reaction_type
-    )
-    
-    result = await db.execute(stmt)
-    return {row.reaction_type: row.count for row in result.all()}
\ No newline at end of file
@@ -1,26 +1,48 @@
-from sqlalchemy.orm import Session
+import os
+import time
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 import models
 import uuid
+from api import schemas
+from singleton.cache import tag_catalog, tag_index
+from singleton.log import logger
+from utils.tag_catalog import TagCatalog
 
 TAG = "Tag Repository -> "
+# Intervalo minimo entre recargas forcadas por uuid desconhecido na criacao de post
+TAG_CATALOG_MISS_REFRESH = float(os.getenv("TAG_CATALOG_MISS_REFRESH", "5"))
+_last_miss_refresh = 0.0
 
 
-def get_tag_by_uuid(db: Session, uuid: str) -> models.Tag:
-    return db.query(models.Tag).filter(models.Tag.uuid == uuid).first()
+async def load_tag_catalog(db: AsyncSession) -> bool:
+    result = await db.execute(select(models.Tag))
+    changed = tag_catalog.load(
+        (schemas.Tag.model_validate(tag), tag.active == True) for tag in result.scalars().all()
+    )
+    if changed:
+        # O indice de autocomplete acompanha cada nova versao do catalogo
+        tag_index.load((tag.uuid, tag.name, tag) for tag in tag_catalog.active())
+        logger.info("{} Tag catalog version {} loaded ({} tags, etag {})".format(
+            TAG, tag_catalog.version, len(tag_catalog), tag_catalog.etag
+        ))
+    return changed
 
-def get_tags_by_uuid(db: Session, uuid_list: list[str]) -> list[models.Tag]:
-    uuid_list = [uuid.UUID(item) for item in uuid_list]
-    return db.query(models.Tag).filter(models.Tag.uuid.in_(uuid_list)).all()
 
-async def get_tags_by_uuid_async(db: AsyncSession, uuid_list: list[str]) -> list[models.Tag]:
-    uuid_objects = [uuid.UUID(item) for item in uuid_list]
-    
-    # Executa a query assíncrona
-    result = await db.execute(
-        select(models.Tag)
-        .where(models.Tag.uuid.in_(uuid_objects))
-    )
-    
-    return result.scalars().all()
+# Recarrega o catalogo so quando passou de max_age; do contrario nao toca no banco
+async def refresh_tag_catalog(db: AsyncSession, max_age: float | None = None) -> TagCatalog:
+    if tag_catalog.stale(max_age):
+        await load_tag_catalog(db)
+    return tag_catalog
+
+
+async def resolve_tag_ids(db: AsyncSession, raw_ids: list[str]) -> list[uuid.UUID]:
+    global _last_miss_refresh
+    catalog = await refresh_tag_catalog(db)
+    found, missing = catalog.resolve(raw_ids)
+    if missing and time.monotonic() - _last_miss_refresh >= TAG_CATALOG_MISS_REFRESH:
+        # Pode ser uma tag criada depois da ultima carga
+        _last_miss_refresh = time.monotonic()
+        await load_tag_catalog(db)
+        found, missing = catalog.resolve(raw_ids)
+    return found
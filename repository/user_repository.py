@@ -1,23 +1,26 @@
 import uuid
 import os
-from sqlalchemy.orm import Session
+import asyncio
 from sqlalchemy.ext.asyncio import AsyncSession
-from models import User, Post, Tag
+from models import User, Post, Tag, UserStats
 from api import schemas
 from utils import security
 from singleton.log import logger
-from fastapi import UploadFile
-from sqlalchemy import func, select, desc
-from repository import post_repository, reaction_repository
+from fastapi import HTTPException, UploadFile, status
+from sqlalchemy import func, select, or_, tuple_
+from sqlalchemy.exc import IntegrityError
+from repository import post_repository, user_stats_repository
+from singleton.cache import user_cache, username_index
 
 TAG = "User Repository -> "
 UPLOAD_FOLDER = "static/uploads/profile_pictures"
+_username_index_lock = asyncio.Lock()
 
 
-def create_user(db: Session, user: schemas.UserCreateRequest):
+async def create_user(db: AsyncSession, user: schemas.UserCreateRequest):
     logger.info("{} create_user called to {}".format(TAG, user.username))
     security.validate_password(user.password, user.confirm_password)
-    encrypted_password=security.hash_password(user.password)
+    encrypted_password=await security.hash_password_async(user.password)
     db_user = User(
         username=user.username,
         email=user.email, 
@@ -26,8 +29,9 @@ def create_user(db: Session, user: schemas.UserCreateRequest):
         bio=user.bio
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    index_user(db_user)
     logger.info("{} {} successfully registered in application".format(TAG, user.username))
     return db_user
 
@@ -46,9 +50,18 @@ async def update_user_profile(
     user.email = email
     user.bio = bio
 
+    # Aplica antes de mexer nos arquivos; se outro cadastro pegou o username
+    # ou o email depois da checagem do router, o indice unico falha aqui
+    try:
+        await db.flush()
+    except IntegrityError:
+        await db.rollback()
+        logger.info("{} username or email already taken on profile update".format(TAG))
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="User with this email or username already exists")
+
     if password and password.strip():
         security.validate_password(password, confirm_password)
-        user.password_hash = security.hash_password(password)
+        user.password = await security.hash_password_async(password)
 
     if profile_picture:
         filename = f"{uuid.uuid4().hex}_{profile_picture.filename}"
@@ -71,7 +84,9 @@ async def update_user_profile(
         user.photo_url = f"/{save_path}"
 
     await db.commit()
+    user_cache.invalidate(user.uuid)
     await db.refresh(user)
+    index_user(user)
 
     return user
 
@@ -87,29 +102,92 @@ async def remove_profile_picture(db: AsyncSession, user: User):
 
     user.photo_url = None
     await db.commit()
+    user_cache.invalidate(user.uuid)
     await db.refresh(user)
+    index_user(user)
 
     return user
 
-async def get_users_preview(db: AsyncSession, user: User, per_page: int, search: str, offset: int):
-    last_post_subq = (
+def index_user(user: User) -> None:
+    username_index.add(user.uuid, user.username, schemas.UserSuggestion.model_validate(user))
+
+
+async def load_username_index(db: AsyncSession) -> int:
+    result = await db.execute(
+        select(User.uuid, User.username, User.photo_url).where(User.deleted_at.is_(None))
+    )
+    username_index.load(
+        (row.uuid, row.username, schemas.UserSuggestion.model_validate(row))
+        for row in result.all()
+    )
+    return len(username_index)
+
+
+# Recarrega o indice so quando passou de max_age: cadastros, renomes e exclusoes
+# feitos em outros workers so aparecem aqui depois de uma recarga. O lock evita
+# que varias requisicoes leiam a tabela de usuarios ao mesmo tempo
+async def refresh_username_index(db: AsyncSession, max_age: float | None = None) -> None:
+    if not username_index.stale(max_age):
+        return
+    async with _username_index_lock:
+        if username_index.stale(max_age):
+            await load_username_index(db)
+
+
+# Tags mais usadas de todos os usuarios da pagina em uma unica consulta
+async def _top_tags_by_user(db: AsyncSession, user_ids: list, limit: int = 3) -> dict:
+    if not user_ids:
+        return {}
+
+    tag_count = func.count(Tag.uuid)
+    counts_subq = (
         select(
             Post.user_id,
-            func.max(Post.created_at).label("last_post_date")
+            Tag.name,
+            Tag.color,
+            tag_count.label("tag_count"),
+            func.row_number().over(
+                partition_by=Post.user_id,
+                order_by=(tag_count.desc(), Tag.name)
+            ).label("position")
         )
-        .where(Post.deleted_at.is_(None))
-        .group_by(Post.user_id)
+        .select_from(Post)
+        .join(Post.tags)
+        .where(Post.user_id.in_(user_ids), Post.deleted_at.is_(None))
+        .group_by(Post.user_id, Tag.name, Tag.color)
         .subquery()
     )
 
-    filters = [User.deleted_at.is_(None), User.username != user.username]
+    result = await db.execute(
+        select(counts_subq.c.user_id, counts_subq.c.name, counts_subq.c.color)
+        .where(counts_subq.c.position <= limit)
+        .order_by(counts_subq.c.user_id, counts_subq.c.position)
+    )
+
+    top_tags = {}
+    for user_id, name, color in result.all():
+        top_tags.setdefault(user_id, []).append({"name": name, "color": color})
+    return top_tags
+
+
+async def get_users_preview(
+        db: AsyncSession,
+        user: User,
+        per_page: int,
+        search: str,
+        offset: int,
+        after: tuple | None = None
+    ):
+    filters = [User.deleted_at.is_(None), User.uuid != user.uuid]
     if search:
         filters.append(
-            func.or_(
+            or_(
                 User.username.ilike(f"%{search}%"),
                 User.email.ilike(f"%{search}%")
             )
         )
+    if after:
+        filters.append(tuple_(User.created_at, User.uuid) < tuple_(*after))
 
     user_query = (
         select(
@@ -117,58 +195,106 @@ async def get_users_preview(db: AsyncSession, user: User, per_page: int, search:
             User.username,
             User.bio,
             User.photo_url,
-            last_post_subq.c.last_post_date
+            User.created_at,
+            UserStats.last_post_date
         )
-        .outerjoin(last_post_subq, User.uuid == last_post_subq.c.user_id)
+        .outerjoin(UserStats, User.uuid == UserStats.user_id)
         .where(*filters)
-        .order_by(User.created_at.desc())
-        .offset(offset)
+        .order_by(User.created_at.desc(), User.uuid.desc())
+        .offset(0 if after else offset)
         .limit(per_page)
-        .distinct(User.username)
     )
 
     result = await db.execute(user_query)
     users_raw = result.all()
 
-    response = []
-
-    for user_id, username, bio, photo_url, last_post_date in users_raw:
-        top_tags = []
-
-        tag_count_query = (
-            select(
-                Tag.name,
-                Tag.color,
-                func.count(Tag.uuid).label("tag_count")
-            )
-            .select_from(Post)
-            .join(Post.tags)
-            .where(Post.user_id == user_id, Post.deleted_at.is_(None))
-            .group_by(Tag.name, Tag.color)
-            .order_by(desc("tag_count"))
-            .limit(3)
-        )
+    top_tags = await _top_tags_by_user(db, [row.uuid for row in users_raw])
 
-        tag_result = await db.execute(tag_count_query)
-        top_tags = [{"name": row[0], "color": row[1]} for row in tag_result.all()]
+    response = []
 
+    for user_id, username, bio, photo_url, created_at, last_post_date in users_raw:
         response.append({
             "uuid": user_id,
             "bio": bio,
             "username": username,
             "photo_url": photo_url,
             "last_post_date": last_post_date,
-            "top_tags": top_tags
+            "created_at": created_at,
+            "top_tags": top_tags.get(user_id, [])
         })
 
     return response
 
 
-async def get_user_visit_info(db: AsyncSession, visitor: User, username: str ) -> schemas.UserProfileVisit:
-    user = await db.execute(
-        select(User).where(User.username == username)
-    )   
-    user = user.scalars().first()
+async def get_user_by_email(db: AsyncSession, email: str) -> User | None:
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
+
+
+async def get_user_by_email_or_username(
+        db: AsyncSession,
+        email: str,
+        username: str,
+        exclude_uuid: uuid.UUID | None = None
+    ) -> User | None:
+    stmt = select(User).where(or_(User.email == email, User.username == username))
+    if exclude_uuid is not None:
+        stmt = stmt.where(User.uuid != exclude_uuid)
+    result = await db.execute(stmt)
+    return result.scalars().first()
+
+
+# Campos do perfil visitado, contadores e versoes da primeira pagina de posts.
+# user e stats podem ser os modelos ou uma linha com as mesmas colunas.
+def _visit_version(user, stats, posts: list[dict]) -> tuple:
+    reactions = user_stats_repository.reactions_by_type(stats)
+    return (
+        user.uuid,
+        user.username,
+        user.bio,
+        user.photo_url,
+        user.created_at,
+        tuple(count or 0 for count in reactions.values()),
+        (stats.post_count if stats else 0) or 0,
+        post_repository.posts_version(posts)
+    )
+
+
+# Validador de /user/visit sem montar a resposta; None se o usuario nao existe
+async def get_user_visit_version(db: AsyncSession, visitor: User, username: str) -> tuple | None:
+    result = await db.execute(
+        select(
+            User.uuid,
+            User.username,
+            User.bio,
+            User.photo_url,
+            User.created_at,
+            *(UserStats.__table__.c[column] for column in user_stats_repository.REACTION_COLUMNS.values()),
+            UserStats.post_count
+        )
+        .outerjoin(UserStats, User.uuid == UserStats.user_id)
+        .where(User.username == username)
+    )
+    row = result.first()
+    if not row:
+        return None
+
+    posts = await post_repository.get_posts_preview_versions(db, visitor, visiting_uuid=row.uuid)
+    return _visit_version(row, row, posts)
+
+
+# Devolve tambem a versao (a mesma de get_user_visit_version) para o ETag
+async def get_user_visit_info(
+        db: AsyncSession,
+        visitor: User,
+        username: str
+    ) -> tuple[schemas.UserProfileVisit, tuple | None]:
+    result = await db.execute(
+        select(User, UserStats)
+        .outerjoin(UserStats, User.uuid == UserStats.user_id)
+        .where(User.username == username)
+    )
+    user, stats = result.first() or (None, None)
 
     if not user:
         return schemas.UserProfileVisit(
@@ -180,7 +306,7 @@ async def get_user_visit_info(db: AsyncSession, visitor: User, username: str ) -
             total_reactions=0,
             is_following=False,
             posts_preview=[],
-        )
+        ), None
     
     posts = await post_repository.get_posts_preview(
         db=db,
@@ -188,17 +314,15 @@ async def get_user_visit_info(db: AsyncSession, visitor: User, username: str ) -
         visiting_uuid=user.uuid
     )
 
-    posts_count = await post_repository.post_count_by_user(db, user)
-    total_reactions = await reaction_repository.get_user_reactions_count_by_type(db, user)
 
     return schemas.UserProfileVisit(
         username=user.username,
         bio=user.bio,
         photo_url=user.photo_url,
         created_at=user.created_at,
-        total_reactions=total_reactions,
+        total_reactions=user_stats_repository.reactions_by_type(stats),
         is_following=False,
         posts_preview=posts,
-        total_posts=posts_count
-    )
+        total_posts=stats.post_count if stats else 0
+    ), _visit_version(user, stats, posts)
 
@@ -0,0 +1,150 @@
+import uuid
+import datetime
+import models
+from sqlalchemy import case, delete, func, select, literal_column
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import dialect_insert
+from singleton.log import logger
+
+TAG = "User Stats Repository -> "
+COUNTERS = (
+    "post_count", "love_count", "like_count", "support_count", "sad_count",
+    "bookmarks_received", "unread_notifications"
+)
+REACTION_COLUMNS = {
+    models.ReactionType.LOVE.name: "love_count",
+    models.ReactionType.LIKE.name: "like_count",
+    models.ReactionType.SUPPORT.name: "support_count",
+    models.ReactionType.SAD.name: "sad_count",
+}
+
+
+def reaction_column(reaction: models.ReactionType | str) -> str:
+    name = reaction.name if isinstance(reaction, models.ReactionType) else reaction
+    return REACTION_COLUMNS[name]
+
+
+# Soma os deltas nos contadores do autor dentro da transacao corrente; o
+# chamador faz o commit junto com a escrita que originou a mudanca.
+async def apply_delta(
+        db: AsyncSession,
+        user_id: uuid.UUID,
+        last_post_date: datetime.datetime | None = None,
+        **deltas: int
+    ) -> None:
+    deltas = {column: value for column, value in deltas.items() if value}
+    if not deltas and last_post_date is None:
+        return
+
+    stats = models.UserStats.__table__
+    now = datetime.datetime.utcnow()
+    values = {column: deltas.get(column, 0) for column in COUNTERS}
+    stmt = dialect_insert(db, stats).values(
+        user_id=user_id, last_post_date=last_post_date, updated_at=now, **values
+    )
+    set_ = {column: stats.c[column] + stmt.excluded[column] for column in deltas}
+    set_["updated_at"] = now
+    if last_post_date is not None:
+        set_["last_post_date"] = stmt.excluded.last_post_date
+    await db.execute(stmt.on_conflict_do_update(index_elements=[stats.c.user_id], set_=set_))
+
+
+async def get_user_stats(db: AsyncSession, user_id: uuid.UUID) -> models.UserStats | None:
+    return await db.get(models.UserStats, user_id)
+
+
+def reactions_by_type(stats: models.UserStats | None) -> dict:
+    return {
+        reaction.value: getattr(stats, reaction_column(reaction)) if stats else 0
+        for reaction in models.ReactionType
+    }
+
+
+# Agregado completo a partir das tabelas de origem; mesmas consultas dos backfills das migracoes 0006 e 0009
+def _stats_select():
+    posts = (
+        select(
+            models.Post.user_id,
+            func.count().label("post_count"),
+            func.max(models.Post.created_at).label("last_post_date")
+        )
+        .where(models.Post.deleted_at.is_(None))
+        .group_by(models.Post.user_id)
+        .subquery()
+    )
+    reactions = (
+        select(
+            models.Post.user_id,
+            *(
+                func.sum(case((models.PostReaction.reaction_type == models.ReactionType[name], 1), else_=0)).label(column)
+                for name, column in REACTION_COLUMNS.items()
+            )
+        )
+        .select_from(models.PostReaction)
+        .join(models.Post, models.Post.uuid == models.PostReaction.post_id)
+        .where(models.Post.deleted_at.is_(None))
+        .group_by(models.Post.user_id)
+        .subquery()
+    )
+    bookmarks = (
+        select(models.Post.user_id, func.count().label("bookmarks_received"))
+        .select_from(models.PostBookmark)
+        .join(models.Post, models.Post.uuid == models.PostBookmark.post_id)
+        .where(models.PostBookmark.deleted_at.is_(None), models.Post.deleted_at.is_(None))
+        .group_by(models.Post.user_id)
+        .subquery()
+    )
+    unread = (
+        select(models.Notification.user_receiver.label("user_id"), func.count().label("unread_notifications"))
+        .where(models.Notification.read == False, models.Notification.deleted_at.is_(None))
+        .group_by(models.Notification.user_receiver)
+        .subquery()
+    )
+    return (
+        select(
+            models.User.uuid.label("user_id"),
+            func.coalesce(posts.c.post_count, 0).label("post_count"),
+            posts.c.last_post_date,
+            *(func.coalesce(reactions.c[column], 0).label(column) for column in REACTION_COLUMNS.values()),
+            func.coalesce(bookmarks.c.bookmarks_received, 0).label("bookmarks_received"),
+            func.coalesce(unread.c.unread_notifications, 0).label("unread_notifications"),
+            literal_column("CURRENT_TIMESTAMP").label("updated_at")
+        )
+        .outerjoin(posts, posts.c.user_id == models.User.uuid)
+        .outerjoin(reactions, reactions.c.user_id == models.User.uuid)
+        .outerjoin(bookmarks, bookmarks.c.user_id == models.User.uuid)
+        .outerjoin(unread, unread.c.user_id == models.User.uuid)
+    )
+
+
+async def rebuild_user_stats(db: AsyncSession) -> int:
+    stats = models.UserStats.__table__
+    source = _stats_select()
+    await db.execute(delete(stats))
+    await db.execute(stats.insert().from_select([column.name for column in source.selected_columns], source))
+    await db.commit()
+    count = (await db.execute(select(func.count()).select_from(stats))).scalar()
+    logger.info("{} Rebuilt statistics for {} users".format(TAG, count))
+    return count
+
+
+# Compara a tabela com o agregado recalculado; retorna {user_id: {coluna: (atual, esperado)}}
+async def check_user_stats(db: AsyncSession) -> dict:
+    columns = COUNTERS + ("last_post_date",)
+    expected = {row.user_id: row for row in (await db.execute(_stats_select())).all()}
+    current = {row.user_id: row for row in (await db.execute(select(models.UserStats))).scalars()}
+
+    mismatches = {}
+    for user_id, row in expected.items():
+        # Usuario sem linha equivale a contadores zerados
+        stored = current.get(user_id) or models.UserStats(
+            user_id=user_id, last_post_date=None, **{column: 0 for column in COUNTERS}
+        )
+        diff = {
+            column: (getattr(stored, column), getattr(row, column))
+            for column in columns
+            if getattr(stored, column) != getattr(row, column)
+        }
+        if diff:
+            mismatches[user_id] = diff
+    return mismatches
@@ -1,40 +1,110 @@
-
-from fastapi import Depends, HTTPException, status, Cookie
+import os
+import json
+import time
+import asyncio
+import datetime
+from fastapi import Depends, HTTPException, status, Query, Response, Cookie
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from api import schemas
-from services import auth_service
+from database import AsyncSessionLocal
+from services import auth_service, notification_service
 from singleton.db import  get_async_db
 from singleton.router import router
 from repository import notification_repository
+from utils import pagination
+
+NOTIFICATION_STREAM_HEARTBEAT = float(os.getenv("NOTIFICATION_STREAM_HEARTBEAT", "25"))
+NOTIFICATION_STREAM_MAX = int(os.getenv("NOTIFICATION_STREAM_MAX", "10000"))
 
 
 @router.get("/notifications/count", status_code=status.HTTP_200_OK)
 async def notifications(
         db: AsyncSession = Depends(get_async_db),
-        access_token: str | None = Cookie(default=None),
+        user: auth_service.CurrentUser = Depends(auth_service.get_current_user),
 ):
-    if not access_token:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing access token")
-
-    user = await auth_service.get_user_by_token(db, access_token)
-
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-    
     return await notification_repository.get_notifications_count(db, user)
 
 
 @router.get("/notifications", response_model=list[schemas.NotificationResponse], status_code=status.HTTP_200_OK)
 async def notifications(
+        response: Response,
         db: AsyncSession = Depends(get_async_db),
-        access_token: str | None = Cookie(default=None),
+        user: auth_service.CurrentUser = Depends(auth_service.get_current_user),
+        per_page: int = Query(20, ge=1, le=100),
+        cursor: str = Query(None),
+        since: datetime.datetime = Query(None)
 ):
+    after = pagination.decode_cursor(cursor) if cursor else None
+    items = await notification_repository.get_notifications(db, user, per_page, after=after, since=since)
+
+    if len(items) == per_page:
+        response.headers["X-Next-Cursor"] = pagination.encode_cursor(items[-1].updated_at, items[-1].uuid)
+    return items
+
+
+@router.post("/notifications/read", status_code=status.HTTP_200_OK)
+async def mark_notifications_read(
+        payload: schemas.NotificationReadRequest,
+        db: AsyncSession = Depends(get_async_db),
+        user: auth_service.CurrentUser = Depends(auth_service.get_current_user),
+):
+    updated = await notification_repository.mark_notifications_read(
+        db, user, before=payload.before, uuids=payload.uuids
+    )
+    await notification_service.publish_unread(db, {user.uuid})
+    return {"updated": updated}
+
+
+def _sse(event: str, data: dict) -> str:
+    return "event: {}\ndata: {}\n\n".format(event, json.dumps(data))
+
+
+# Server-Sent Events com o contador de nao lidas. Autentica so pelo token (sem
+# sessao de banco presa a conexao), envia o valor atual ao conectar e depois
+# cada mudanca publicada pelo notification_service; comentarios de heartbeat
+# mantem proxies abertos. A conexao termina quando o token expira.
+@router.get("/notifications/stream")
+async def notifications_stream(access_token: str | None = Cookie(default=None)):
     if not access_token:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing access token")
+    user_uuid, payload = auth_service.decode_token(access_token)
+    if len(notification_service.notification_hub) >= NOTIFICATION_STREAM_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many open streams",
+            headers={"Retry-After": "30"}
+        )
+
+    expires_at = payload.get("exp", time.time() + 86400)
+
+    async def events():
+        # Inscreve so quando o stream comeca (se o cliente cair antes, nada
+        # fica preso no hub) e o finally sempre desinscreve. O contador e lido
+        # depois da inscricao: uma mudanca no meio chega pela fila
+        subscription = notification_service.notification_hub.subscribe(user_uuid)
+        try:
+            async with AsyncSessionLocal() as db:
+                user = auth_service.CurrentUser(db, user_uuid, payload.get("username"), payload)
+                unread = await notification_repository.get_notifications_count(db, user)
 
-    user = await auth_service.get_user_by_token(db, access_token)
+            yield "retry: 5000\n\n"
+            yield _sse("unread", {"unread": unread})
+            while True:
+                remaining = expires_at - time.time()
+                if remaining <= 0:
+                    yield _sse("expired", {})
+                    return
+                try:
+                    message = await subscription.get(timeout=min(NOTIFICATION_STREAM_HEARTBEAT, remaining))
+                    yield _sse("unread", message)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+        finally:
+            notification_service.notification_hub.unsubscribe(subscription)
 
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-    
-    return await notification_repository.get_notifications(db, user)
\ No newline at end of file
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
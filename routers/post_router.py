@@ -3,11 +3,13 @@ from services import auth_service, notification_service
 import models
 
 from uuid import UUID
-from fastapi import  Depends, HTTPException, status, Cookie, Query
+from fastapi import  Depends, HTTPException, status, Query, Request
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.future import select
-from api import schemas
+from api import responses, schemas
+from utils import conditional, pagination
 from singleton.db import get_async_db
 from singleton.router import router
 
@@ -15,65 +17,70 @@ from singleton.router import router
 
 @router.get("/posts/preview", response_model=list[schemas.PostPreview])
 async def get_posts(
+    request: Request,
     db: AsyncSession = Depends(get_async_db),
-    access_token: str | None = Cookie(default=None),
+    user: auth_service.CurrentUser = Depends(auth_service.get_current_user),
     page: int = Query(1, ge=1),
     per_page: int = Query(10, ge=1, le=100),
-    search: str = Query(None)
+    search: str = Query(None),
+    cursor: str = Query(None)
 ):
-    if not access_token:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing access token")
+    offset = (page - 1) * per_page
+    after = pagination.decode_cursor(cursor) if cursor else None
 
-    user = await auth_service.get_user_by_token(db, access_token)
+    # Revalidacao da mesma pagina: compara so as versoes dos posts
+    if not search and request.headers.get("if-none-match"):
+        versions = await post_repository.get_posts_preview_versions(db, user, per_page, offset, after=after)
+        etag = conditional.make_etag(*post_repository.posts_version(versions))
+        if conditional.is_fresh(request, etag):
+            next_cursor = pagination.next_cursor(versions, per_page)
+            return conditional.not_modified(etag, headers={"X-Next-Cursor": next_cursor} if next_cursor else None)
 
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-    offset = (page - 1) * per_page
-    response = await post_repository.get_posts_preview(db, user, page, per_page, search, offset)
-    return response
+    posts = await post_repository.get_posts_preview(db, user, page, per_page, search, offset, after=after)
+
+    # Busca e ordenada por relevancia e pagina com page, sem cursor
+    headers = {}
+    next_cursor = None if search else pagination.next_cursor(posts, per_page)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if not search:
+        headers.update(conditional.validator_headers(conditional.make_etag(*post_repository.posts_version(posts))))
+    return responses.post_previews(posts, headers)
 
 
 @router.post("/posts/create", status_code=status.HTTP_201_CREATED, response_model=str)
 async def create_post(
     post_payload: schemas.PostCreateRequest,
     db: AsyncSession = Depends(get_async_db),
-    access_token: str | None = Cookie(default=None),
+    user: auth_service.CurrentUser = Depends(auth_service.get_current_user),
 ):
-    if not access_token:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing access token")
-
-    user = await auth_service.get_user_by_token(db, access_token)
-
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-
-    tags = await tag_repository.get_tags_by_uuid_async(db, post_payload.categories)
-    if not tags:
+    tag_ids = await tag_repository.resolve_tag_ids(db, post_payload.categories)
+    if not tag_ids:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tags not found")
 
-    db_post = await post_repository.create_post(db, post_payload, user, tags)
+    db_post = await post_repository.create_post(db, post_payload, user, tag_ids)
     return str(db_post.uuid)
 
 @router.get("/post/detail/{uuid}", response_model=schemas.PostDetail)
 async def get_post(
     uuid: str,
+    request: Request,
     db: AsyncSession = Depends(get_async_db),
-    access_token: str | None = Cookie(default=None)
+    user: auth_service.CurrentUser = Depends(auth_service.get_current_user)
     ):
+    if request.headers.get("if-none-match"):
+        version = await post_repository.get_post_detail_version(db, user, UUID(uuid))
+        if version:
+            etag = conditional.make_etag(*post_repository.posts_version([version]))
+            if conditional.is_fresh(request, etag):
+                return conditional.not_modified(etag)
 
-    if not access_token:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing access token")
-    
-    user = await auth_service.get_user_by_token(db, access_token)
-
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-    
     db_post = await post_repository.get_post_detail(db, user, UUID(uuid))
     if not db_post:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
     
-    return db_post
+    etag = conditional.make_etag(*post_repository.posts_version([db_post]))
+    return ORJSONResponse(responses.post_detail(db_post), headers=conditional.validator_headers(etag))
 
 
 
@@ -81,16 +88,8 @@ async def get_post(
 async def bookmark_post(
     post_uuid: str, 
     db: AsyncSession = Depends(get_async_db), 
-    access_token: str | None = Cookie(default=None)
+    user: auth_service.CurrentUser = Depends(auth_service.get_current_user)
 ):
-    if not access_token:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing access token")
-    
-    user = await auth_service.get_user_by_token(db, access_token)
-
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-
     post_result = await db.execute(select(models.Post).where(models.Post.uuid == UUID(post_uuid)))
     db_post = post_result.scalar_one_or_none()
     
@@ -100,7 +99,7 @@ async def bookmark_post(
     try:
         bookmarked = await post_repository.post_bookmark(db, db_post, user)
         if bookmarked:
-            await notification_service.create_bookmark_notification(db, db_post, user)
+            notification_service.create_bookmark_notification(db_post, user)
         return bookmarked
     except Exception as e:
         import traceback
@@ -115,40 +114,33 @@ async def bookmark_post(
 async def reaction_post(
         reaction_payload: schemas.ReactionRequest,
         db: AsyncSession = Depends(get_async_db),
-        access_token: str | None = Cookie(default=None)
+        user: auth_service.CurrentUser = Depends(auth_service.get_current_user)
     ):
-    if not access_token:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing access token")
-    
-    user = await auth_service.get_user_by_token(db, access_token)
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-    
     post_result = await db.execute(select(models.Post).where(models.Post.uuid == UUID(reaction_payload.post_uuid)))
     db_post = post_result.scalar_one_or_none()
     
     if not db_post:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
     
-    await notification_service.create_reaction_notification(db, db_post, user, reaction_payload.reaction)
-    return await reaction_repository.create_post_reaction(db, db_post, user, reaction_payload.reaction)
+    response = await reaction_repository.create_post_reaction(db, db_post, user, reaction_payload.reaction)
+    if response["status"] == "success" and response["changed"]:
+        notification_service.create_reaction_notification(db_post, user, reaction_payload.reaction)
+    return response
 
 
 @router.get("/posts/bookmarked", response_model=list[schemas.PostPreview])
 async def bookmarked_posts(
         db: AsyncSession = Depends(get_async_db),
-        access_token: str | None = Cookie(default=None),
+        user: auth_service.CurrentUser = Depends(auth_service.get_current_user),
         page: int = Query(1, ge=1),
         per_page: int = Query(10, ge=1, le=100),
-        search: str = Query(None)
+        search: str = Query(None),
+        cursor: str = Query(None)
     ):
-        if not access_token:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing access token")
-
-        user = await auth_service.get_user_by_token(db, access_token)
-
-        if not user:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
         offset = (page - 1) * per_page
-        return await post_repository.get_posts_preview(db, user, page, per_page, search, offset, bookmarked=True)
+        after = pagination.decode_cursor(cursor) if cursor else None
+        posts = await post_repository.get_bookmarked_posts_preview(db, user, per_page, search, offset, after=after)
+
+        next_cursor = pagination.next_cursor(posts, per_page, "bookmarked_at", "bookmark_uuid")
+        return responses.post_previews(posts, {"X-Next-Cursor": next_cursor} if next_cursor else None)
         
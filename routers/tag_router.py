@@ -1,15 +1,43 @@
 import models
 from fastapi import status
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from api import schemas
-from singleton.db import get_db
+from repository import tag_repository
+from singleton.db import get_async_db
+from singleton.cache import tag_index
 from singleton.router import router
+from utils import conditional
 
+# Lista publica, igual para todos os usuarios
+CATEGORIES_CACHE = "public, max-age=60"
 
+
+# Servido do catalogo em memoria; o ETag muda junto com a versao do catalogo
 @router.get("/categories", response_model=list[schemas.Tag])
-async def get_categories(db: Session = Depends(get_db)):
-    return db.query(models.Tag).filter(models.Tag.active == True).all()
+async def get_categories(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
+    ):
+    catalog = await tag_repository.refresh_tag_catalog(db)
+    if conditional.is_fresh(request, catalog.etag):
+        return conditional.not_modified(catalog.etag, CATEGORIES_CACHE, vary=None)
+
+    conditional.set_validators(response, catalog.etag, CATEGORIES_CACHE, vary=None)
+    return catalog.active()
+
+
+@router.get("/categories/suggest", response_model=list[schemas.Tag])
+async def suggest_categories(
+    db: AsyncSession = Depends(get_async_db),
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50)
+    ):
+    # Garante que o indice esta carregado (recarrega junto com o catalogo)
+    await tag_repository.refresh_tag_catalog(db)
+    return tag_index.search(q, limit)
 
 
 # @router.post("/bulk_create_tags", status_code=status.HTTP_201_CREATED)
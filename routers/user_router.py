@@ -1,15 +1,15 @@
 import models
 import uuid
-from fastapi import Depends, HTTPException,  UploadFile, File, Form, status, Cookie, Query
+import datetime
+from fastapi import Depends, HTTPException,  UploadFile, File, Form, status, Query, Request, Response
 from fastapi.responses import JSONResponse
-from sqlalchemy import or_
-from sqlalchemy.orm import Session
 from sqlalchemy.ext.asyncio import AsyncSession
 from api import schemas
-from utils import security
+from utils import conditional, security, pagination
 from services import auth_service
-from singleton.db import get_db, get_async_db
+from singleton.db import get_async_db
 from singleton.router import router
+from singleton.cache import username_index
 from repository import user_repository
 
 
@@ -25,14 +25,9 @@ async def register(
     confirm_password: str = Form(...),
     bio: str = Form(""),
     photo: UploadFile = File(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.query(models.User).filter(
-        or_(
-            models.User.email == email,
-            models.User.username == username
-        )
-    ).first()
+    user = await user_repository.get_user_by_email_or_username(db, email, username)
     if user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="User with this email or username already exists")
 
@@ -53,20 +48,23 @@ async def register(
         photo_url=photo_url
     )
 
-    user_repository.create_user(db, user_data)
+    await user_repository.create_user(db, user_data)
 
     return HTTPException(detail="User successfully registered", status_code=status.HTTP_201_CREATED)
 
 @router.post("/login", response_model=schemas.LoginResponse)
-async def login(user_credentials: schemas.LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(
-        models.User.email == user_credentials.email).first()
+async def login(user_credentials: schemas.LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    user = await user_repository.get_user_by_email(db, user_credentials.email)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User Not Found")
     
-    if not security.verify_password(user_credentials.password, user.password):
+    if not await security.verify_password_async(user_credentials.password, user.password):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid Credentials")
-    token_data = auth_service.create_access_token(user_uuid=str(user.uuid), remember=user_credentials.remember)
+    token_data = auth_service.create_access_token(
+        user_uuid=str(user.uuid),
+        remember=user_credentials.remember,
+        username=user.username
+    )
     access_token = token_data["access_token"]
     max_age = token_data["exp"]
 
@@ -84,19 +82,23 @@ async def login(user_credentials: schemas.LoginRequest, db: Session = Depends(ge
 
 
 @router.get("/user/profile", response_model=schemas.UserProfile)
-async def get_profile(db: AsyncSession = Depends(get_async_db), access_token: str | None = Cookie(default=None)):
-    if not access_token:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing access token")
-
-    user = await auth_service.get_user_by_token(db, access_token)
+async def get_profile(
+    request: Request,
+    response: Response,
+    current_user: auth_service.CurrentUser = Depends(auth_service.get_current_user)
+    ):
+    # O registro vem do user_cache; o ETag sai dos proprios campos do perfil
+    user = await current_user.get_user()
+    etag = conditional.make_etag(user.uuid, user.username, user.email, user.bio, user.photo_url, user.updated_at)
+    if conditional.is_fresh(request, etag):
+        return conditional.not_modified(etag)
 
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-    
+    conditional.set_validators(response, etag)
     return user
 
 @router.patch("/user/profile", response_model=schemas.UserProfile)
 async def update_profile(
+    response: Response,
     username: str = Form(...),
     email: str = Form(...),
     bio: str = Form(...),
@@ -104,31 +106,40 @@ async def update_profile(
     confirm_password: str = Form(None),
     profile_picture: UploadFile = File(None),
     db: AsyncSession = Depends(get_async_db),
-    access_token: str | None = Cookie(default=None)
+    current_user: auth_service.CurrentUser = Depends(auth_service.get_current_user)
 ):
-    if not access_token:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing access token")
+    user = await current_user.get_user()
 
-    user = await auth_service.get_user_by_token(db, access_token)
+    conflict = await user_repository.get_user_by_email_or_username(db, email, username, exclude_uuid=user.uuid)
+    if conflict:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="User with this email or username already exists")
 
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    updated_user = await user_repository.update_user_profile(db, user, username, email, bio, password, confirm_password, profile_picture)
 
-    response = await user_repository.update_user_profile(db, user, username, email, bio, password, confirm_password, profile_picture)
-    return response
+    # O username viaja no token, entao o cookie e reemitido quando ele muda
+    if updated_user.username != current_user.username:
+        expire = datetime.datetime.fromtimestamp(current_user.payload["exp"], datetime.timezone.utc)
+        token_data = auth_service.create_access_token(
+            user_uuid=str(updated_user.uuid),
+            username=updated_user.username,
+            expire=expire
+        )
+        response.set_cookie(
+            key="access_token",
+            value=token_data["access_token"],
+            httponly=True,
+            expires=expire,
+            samesite="Lax",
+            secure=False
+        )
+    return updated_user
 
 @router.patch("/user/profile/remove_picture")
 async def remove_profile_picture(
     db: AsyncSession = Depends(get_async_db),
-    access_token: str | None = Cookie(default=None)
+    current_user: auth_service.CurrentUser = Depends(auth_service.get_current_user)
     ):
-    if not access_token:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing access token")
-
-    user = await auth_service.get_user_by_token(db, access_token)
-
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    user = await current_user.get_user()
 
     response = await user_repository.remove_profile_picture(db, user)
     return response
@@ -136,40 +147,63 @@ async def remove_profile_picture(
 
 @router.get("/users/preview", response_model=list[schemas.UserPreview])
 async def get_users_preview(
+    response: Response,
     db: AsyncSession = Depends(get_async_db),
-    access_token: str | None = Cookie(default=None),
+    user: auth_service.CurrentUser = Depends(auth_service.get_current_user),
     page: int = Query(1, ge=1),
     per_page: int = Query(10, ge=1, le=100),
-    search: str = Query(None)
+    search: str = Query(None),
+    cursor: str = Query(None)
     ):
-    if not access_token:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing access token")
+    offset = (page - 1) * per_page
+    after = pagination.decode_cursor(cursor) if cursor else None
+    users = await user_repository.get_users_preview(db, user, per_page, search, offset, after=after)
 
-    user = await auth_service.get_user_by_token(db, access_token)
+    next_cursor = pagination.next_cursor(users, per_page)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return users
+
+
+@router.get("/users/suggest", response_model=list[schemas.UserSuggestion])
+async def suggest_users(
+    user: auth_service.CurrentUser = Depends(auth_service.get_current_user),
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_db)
+    ):
+    # Busca so no indice em memoria (o banco so e lido quando o indice passou do
+    # max_age); +1 para poder descartar o proprio usuario
+    await user_repository.refresh_username_index(db)
+    suggestions = username_index.search(q, limit + 1)
+    return [suggestion for suggestion in suggestions if suggestion.uuid != user.uuid][:limit]
 
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-    
-    offset = (page - 1) * per_page
-    response = await user_repository.get_users_preview(db, user, per_page, search, offset)
-    return response
+
+def _check_not_own_profile(user: auth_service.CurrentUser, version: tuple) -> None:
+    if version[0] == user.uuid:
+        raise HTTPException(status_code=status.HTTP_307_TEMPORARY_REDIRECT, detail="You can't visit your own profile")
 
 
 @router.get("/user/visit/{username}", response_model=schemas.UserProfileVisit)
 async def get_user_profile_vist_info(
         username: str,
-        access_token: str | None = Cookie(default=None),
+        request: Request,
+        response: Response,
+        user: auth_service.CurrentUser = Depends(auth_service.get_current_user),
         db: AsyncSession = Depends(get_async_db)
     ):
-
-    if not access_token:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing access token")
-
-    user = await auth_service.get_user_by_token(db, access_token)
-
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-    if user.username == username:
-        raise HTTPException(status_code=status.HTTP_307_TEMPORARY_REDIRECT, detail="You can't visit your own profile")
+    # A identidade vem do uuid (version[0] e o uuid do visitado); a claim
+    # username do token pode estar desatualizada e serve so para exibicao
+    if request.headers.get("if-none-match"):
+        version = await user_repository.get_user_visit_version(db, user, username)
+        if version is not None:
+            _check_not_own_profile(user, version)
+            etag = conditional.make_etag(*version)
+            if conditional.is_fresh(request, etag):
+                return conditional.not_modified(etag)
     
-    return await user_repository.get_user_visit_info(db, user, username)
\ No newline at end of file
+    visit, version = await user_repository.get_user_visit_info(db, user, username)
+    if version is not None:
+        _check_not_own_profile(user, version)
+        conditional.set_validators(response, conditional.make_etag(*version))
+    return visit
\ No newline at end of file
@@ -3,28 +3,36 @@ import os
 import datetime
 import uuid
 import models
-from dotenv import load_dotenv
-from fastapi import HTTPException, Depends
+from fastapi import HTTPException, Depends, Cookie, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.orm import make_transient_to_detached
+from singleton.cache import user_cache
+from singleton.db import get_async_db
 
-load_dotenv()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "secret")
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 
-def create_access_token(user_uuid: str, remember: bool = False) -> dict[str, str]:
-    if remember:
+def create_access_token(
+        user_uuid: str,
+        remember: bool = False,
+        username: str | None = None,
+        expire: datetime.datetime | None = None
+    ) -> dict[str, str]:
+    if expire is None and remember:
         expire=datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=30)
-    else:
+    elif expire is None:
         expire=datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=24)
     
     to_encode={
         "sub": user_uuid,
         "exp": expire
     }
+    if username is not None:
+        to_encode["username"] = username
     token=jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     response={
         "access_token": token,
@@ -34,7 +42,7 @@ def create_access_token(user_uuid: str, remember: bool = False) -> dict[str, str
     return response
 
 
-def verify_token(token:str = Depends(oauth2_scheme)) -> str:
+def decode_token(token: str) -> tuple[uuid.UUID, dict]:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_uuid_raw: str = payload.get("sub")
@@ -44,13 +52,73 @@ def verify_token(token:str = Depends(oauth2_scheme)) -> str:
            user_uuid = uuid.UUID(user_uuid_raw)
         except ValueError:
             raise HTTPException(status_code=401, detail="Invalid decoded information")
-        return user_uuid
+        return user_uuid, payload
     except Exception as e:
         raise HTTPException(status_code=401, detail="Invalid token: {}".format(e))
 
 
-async def get_user_by_token(db: AsyncSession, access_token: str) -> models.User:
-    user_uuid = verify_token(access_token)
+def verify_token(token:str = Depends(oauth2_scheme)) -> str:
+    user_uuid, _ = decode_token(token)
+    return user_uuid
+
+
+def _user_snapshot(user: models.User) -> dict:
+    return {column.key: getattr(user, column.key) for column in models.User.__table__.columns}
+
+
+async def get_user_by_uuid(db: AsyncSession, user_uuid: uuid.UUID) -> models.User:
+    snapshot = user_cache.get(user_uuid)
+    if snapshot is not None:
+        # Reanexa o usuario em cache na sessao atual sem ir ao banco
+        user = models.User(**snapshot)
+        make_transient_to_detached(user)
+        return await db.merge(user, load=False)
+
     stmt = select(models.User).where(models.User.uuid == user_uuid)
     result = await db.execute(stmt)
-    return result.scalar_one_or_none()
\ No newline at end of file
+    user = result.scalar_one_or_none()
+    if user is not None:
+        user_cache.set(user_uuid, _user_snapshot(user))
+    return user
+
+
+async def get_user_by_token(db: AsyncSession, access_token: str) -> models.User:
+    user_uuid = verify_token(access_token)
+    return await get_user_by_uuid(db, user_uuid)
+
+
+# uuid e username vem das claims do token; o registro completo so e
+# carregado (uma vez por request) quando get_user() e chamado
+class CurrentUser:
+    def __init__(self, db: AsyncSession, user_uuid: uuid.UUID, username: str, payload: dict):
+        self.db = db
+        self.uuid = user_uuid
+        self.username = username
+        self.payload = payload
+        self._user: models.User | None = None
+
+    async def get_user(self) -> models.User:
+        if self._user is None:
+            user = await get_user_by_uuid(self.db, self.uuid)
+            if not user:
+                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+            self._user = user
+        return self._user
+
+
+async def get_current_user(
+        db: AsyncSession = Depends(get_async_db),
+        access_token: str | None = Cookie(default=None)
+    ) -> CurrentUser:
+    if not access_token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing access token")
+
+    user_uuid, payload = decode_token(access_token)
+    current_user = CurrentUser(db, user_uuid, payload.get("username"), payload)
+
+    # Tokens emitidos antes da claim username precisam do registro completo
+    if current_user.username is None:
+        user = await current_user.get_user()
+        current_user.username = user.username
+
+    return current_user
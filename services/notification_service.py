@@ -1,65 +1,170 @@
+import os
+import asyncio
+import datetime
 from uuid import UUID
 from api.schemas import NotificationCreateRequest
+from database import AsyncSessionLocal
 from repository import notification_repository
-from sqlalchemy.ext.asyncio import AsyncSession
 from models import Post, User
 from singleton.log import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+from utils.pubsub import PubSub
 
 
 TAG = "Notification Service -> "
+NOTIFICATION_QUEUE_SIZE = int(os.getenv("NOTIFICATION_QUEUE_SIZE", "10000"))
+NOTIFICATION_BATCH_SIZE = int(os.getenv("NOTIFICATION_BATCH_SIZE", "200"))
+NOTIFICATION_BATCH_MS = float(os.getenv("NOTIFICATION_BATCH_MS", "100"))
+NOTIFICATION_SHUTDOWN_TIMEOUT = float(os.getenv("NOTIFICATION_SHUTDOWN_TIMEOUT", "10"))
+# Janela de agregacao de reacoes/bookmarks no mesmo post; 0 desliga
+NOTIFICATION_COALESCE_SECONDS = float(os.getenv("NOTIFICATION_COALESCE_SECONDS", "3600"))
+# Mensagens pendentes por conexao de /notifications/stream
+NOTIFICATION_STREAM_BUFFER = int(os.getenv("NOTIFICATION_STREAM_BUFFER", "16"))
+
+# Conexoes abertas de /notifications/stream, por uuid do destinatario
+notification_hub = PubSub(buffer_size=NOTIFICATION_STREAM_BUFFER)
+
+
+async def publish_unread(db: AsyncSession, user_ids: set[UUID]) -> None:
+    listening = {user_id for user_id in user_ids if notification_hub.has_subscribers(user_id)}
+    if not listening:
+        return
+    counts = await notification_repository.get_unread_counts(db, listening)
+    for user_id, count in counts.items():
+        notification_hub.publish(user_id, {"unread": count})
+
+
+# Notificacoes saem do caminho da request: os handlers so enfileiram e um worker
+# em background grava em lotes (ate batch_size itens ou batch_ms de espera) com
+# um unico commit por lote. Fila cheia descarta a notificacao com um aviso.
+class NotificationQueue:
+    def __init__(self, maxsize: int, batch_size: int, batch_ms: float, coalesce_seconds: float):
+        self.batch_size = batch_size
+        self.batch_ms = batch_ms
+        self.coalesce_window = datetime.timedelta(seconds=coalesce_seconds) if coalesce_seconds > 0 else None
+        self.written = 0
+        self.dropped = 0
+        self._queue: asyncio.Queue[NotificationCreateRequest] = asyncio.Queue(maxsize=maxsize)
+        self._task: asyncio.Task | None = None
+
+    def enqueue(self, notification: NotificationCreateRequest) -> None:
+        try:
+            self._queue.put_nowait(notification)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning("{} Queue full, dropping notification to {}".format(TAG, notification.user_receiver))
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+        }
 
-async def _create_notification(
-        db: AsyncSession,
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = NOTIFICATION_SHUTDOWN_TIMEOUT) -> None:
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("{} {} notifications not written before shutdown".format(TAG, self._queue.qsize()))
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _next_batch(self) -> list[NotificationCreateRequest]:
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.batch_ms / 1000
+        while len(batch) < self.batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                async with AsyncSessionLocal() as db:
+                    self.written += await notification_repository.create_notifications(
+                        db, batch, coalesce_window=self.coalesce_window
+                    )
+                    await publish_unread(db, {notification.user_receiver for notification in batch})
+            except Exception as e:
+                logger.error("{} Error while writing {} notifications: {}".format(TAG, len(batch), e))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+notification_queue = NotificationQueue(
+    maxsize=NOTIFICATION_QUEUE_SIZE,
+    batch_size=NOTIFICATION_BATCH_SIZE,
+    batch_ms=NOTIFICATION_BATCH_MS,
+    coalesce_seconds=NOTIFICATION_COALESCE_SECONDS,
+)
+
+
+def _create_notification(
         user_generator: User,
         user_receiver: UUID,
         post_id: UUID,
         content: str,
         notification_type: str = "att",
-        title: str = "Nova mensagem"
+        title: str = "Nova mensagem",
+        event: str | None = None,
+        post_title: str | None = None
     ) -> None:
+    notification_queue.enqueue(NotificationCreateRequest(
+        title=title,
+        content=content,
+        notification_type=notification_type,
+        user_generator=user_generator.uuid,
+        user_receiver=user_receiver,
+        post_id=post_id,
+        event=event,
+        actor_name=user_generator.username,
+        post_title=post_title
+    ))
 
-    try:
-        notification_schema = NotificationCreateRequest(
-            title=title,
-            content=content,
-            notification_type=notification_type,
-            user_generator=user_generator.uuid,
-            user_receiver=user_receiver,
-            post_id=post_id
-        )
-        
-        await notification_repository.create_notification(db, notification_schema)
-    except Exception as e:
-        await db.rollback()
-        logger.error(f"{TAG} Error while handling notification: {e}")
-
-
-async def create_bookmark_notification(
-        db: AsyncSession, 
+
+def create_bookmark_notification(
         post: Post,
         user_generator: User
     ) -> None:
     content = f"O usuário {user_generator.username} salvou o seu post '{post.title}' como favorito"
-    await _create_notification(
-        db=db,
+    _create_notification(
         user_generator=user_generator,
         user_receiver=post.user_id,
         post_id=post.uuid,
-        content=content
+        content=content,
+        event="bookmark",
+        post_title=post.title
     )
 
 
-async def create_reaction_notification(
-        db: AsyncSession, 
+def create_reaction_notification(
         post: Post,
         user_generator: User,
         reaction: str
     ) -> None:
     content = f"O usuário {user_generator.username} reagiu ao seu post '{post.title}' com '{reaction}'"
-    await _create_notification(
-        db=db,
+    _create_notification(
         user_generator=user_generator,
         user_receiver=post.user_id,
         post_id=post.uuid,
-        content=content
-    )
\ No newline at end of file
+        content=content,
+        event="reaction",
+        post_title=post.title
+    )
@@ -0,0 +1,160 @@
+import os
+import asyncio
+import threading
+import uuid
+import models
+from database import AsyncSessionLocal, dialect_insert
+from repository import user_stats_repository
+from singleton.log import logger
+
+TAG = "Reaction Counter Service -> "
+REACTION_BUFFER_ENABLED = os.getenv("REACTION_BUFFER_ENABLED", "false").lower() in ("1", "true", "yes")
+REACTION_FLUSH_MS = float(os.getenv("REACTION_FLUSH_MS", "250"))
+REACTION_FLUSH_EVENTS = int(os.getenv("REACTION_FLUSH_EVENTS", "500"))
+COUNTERS = tuple(reaction.value for reaction in models.ReactionType)
+
+
+def _merge(target: dict, post_id: uuid.UUID, deltas: dict) -> None:
+    counters = target.setdefault(post_id, dict.fromkeys(COUNTERS, 0))
+    for counter, delta in deltas.items():
+        counters[counter] += delta
+
+
+# Acumula em memoria os deltas de contadores de reacao por post e grava tudo
+# de uma vez a cada REACTION_FLUSH_MS ou REACTION_FLUSH_EVENTS reacoes. Os
+# deltas ainda nao gravados (pendentes ou em flush) sao somados nas leituras
+# via overlay(). Cada processo tem o seu buffer; deltas pendentes sao perdidos
+# se o processo morrer sem passar pelo shutdown.
+class ReactionCounterBuffer:
+    def __init__(self, enabled: bool, flush_ms: float, flush_events: int):
+        self.enabled = enabled
+        self.flush_ms = flush_ms
+        self.flush_events = flush_events
+        self.flushes = 0
+        self.flushed_events = 0
+        self._pending: dict[uuid.UUID, dict[str, int]] = {}
+        self._flushing: dict[uuid.UUID, dict[str, int]] = {}
+        self._authors: dict[uuid.UUID, uuid.UUID] = {}
+        self._events = 0
+        self._lock = threading.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+
+    def add(self, post_id: uuid.UUID, author_id: uuid.UUID, deltas: dict[str, int]) -> None:
+        with self._lock:
+            _merge(self._pending, post_id, deltas)
+            self._authors[post_id] = author_id
+            self._events += 1
+            full = self._events >= self.flush_events
+        if full and self._wakeup is not None:
+            self._wakeup.set()
+
+    def overlay(self, post_id: uuid.UUID, counts: dict) -> dict:
+        with self._lock:
+            buffered = [deltas[post_id] for deltas in (self._flushing, self._pending) if post_id in deltas]
+        if not buffered:
+            return counts
+        counts = dict(counts)
+        for deltas in buffered:
+            for counter, delta in deltas.items():
+                counts[counter] = (counts.get(counter) or 0) + delta
+        return counts
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "pending_posts": len(self._pending),
+                "pending_events": self._events,
+                "flushes": self.flushes,
+                "flushed_events": self.flushed_events,
+            }
+
+    async def start(self) -> None:
+        if not self.enabled or self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info("{} Buffering reaction counters every {}ms or {} events".format(
+            TAG, self.flush_ms, self.flush_events
+        ))
+
+    # Nao cancela o loop: um flush em andamento termina (ou devolve os deltas ao
+    # buffer) e o proprio loop faz a ultima rodada antes de sair
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+            self._stopping = False
+        await self.flush()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_ms / 1000)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                self._flushing, self._pending = self._pending, {}
+                authors, self._authors = self._authors, {}
+                events, self._events = self._events, 0
+
+            try:
+                await self._write(self._flushing, authors)
+            except BaseException as e:
+                # Devolve os deltas ao buffer (inclusive em cancelamento); a
+                # proxima rodada tenta de novo
+                with self._lock:
+                    for post_id, deltas in self._flushing.items():
+                        _merge(self._pending, post_id, deltas)
+                    self._authors = {**authors, **self._authors}
+                    self._events += events
+                    self._flushing = {}
+                if not isinstance(e, Exception):
+                    raise
+                logger.error("{} Error while flushing reaction counters: {}".format(TAG, e))
+                return 0
+
+            with self._lock:
+                posts = len(self._flushing)
+                self._flushing = {}
+                self.flushes += 1
+                self.flushed_events += events
+            return posts
+
+    async def _write(self, counters: dict, authors: dict) -> None:
+        counts_table = models.PostReactionCount.__table__
+        author_deltas: dict[uuid.UUID, dict[str, int]] = {}
+        async with AsyncSessionLocal() as db:
+            for post_id, deltas in counters.items():
+                stmt = dialect_insert(db, counts_table).values(post_id=post_id, **deltas)
+                await db.execute(stmt.on_conflict_do_update(
+                    index_elements=[counts_table.c.post_id],
+                    set_={counter: counts_table.c[counter] + stmt.excluded[counter] for counter in COUNTERS}
+                ))
+                author = author_deltas.setdefault(authors[post_id], {})
+                for counter, delta in deltas.items():
+                    column = user_stats_repository.reaction_column(models.ReactionType(counter))
+                    author[column] = author.get(column, 0) + delta
+
+            for author_id, deltas in author_deltas.items():
+                await user_stats_repository.apply_delta(db, author_id, **deltas)
+            await db.commit()
+
+
+reaction_buffer = ReactionCounterBuffer(
+    enabled=REACTION_BUFFER_ENABLED,
+    flush_ms=REACTION_FLUSH_MS,
+    flush_events=REACTION_FLUSH_EVENTS,
+)
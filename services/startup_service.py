@@ -0,0 +1,74 @@
+import os
+import uuid
+import asyncio
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from database import AsyncSessionLocal, DB_POOL_SIZE
+from repository import notification_repository, post_repository, tag_repository, user_repository
+from singleton.cache import tag_catalog, unread_cache, user_cache, search_cache
+from singleton.log import logger
+
+TAG = "Startup Service -> "
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+DB_POOL_PREWARM = int(os.getenv("DB_POOL_PREWARM", str(min(4, DB_POOL_SIZE))))
+
+
+def _current_revision(connection) -> str | None:
+    return MigrationContext.configure(connection).get_current_revision()
+
+
+async def check_schema_version(engine: AsyncEngine) -> str:
+    head = ScriptDirectory.from_config(Config(ALEMBIC_INI)).get_current_head()
+    async with engine.connect() as connection:
+        current = await connection.run_sync(_current_revision)
+
+    if current != head:
+        raise RuntimeError(
+            "Database schema is at revision {} but the code expects {}; run 'alembic upgrade head'".format(
+                current, head
+            )
+        )
+    logger.info("{} Schema at revision {}".format(TAG, current))
+    return current
+
+
+async def prewarm_pool(engine: AsyncEngine, size: int = DB_POOL_PREWARM) -> None:
+    connections = [await engine.connect() for _ in range(size)]
+    try:
+        await asyncio.gather(*(connection.execute(text("SELECT 1")) for connection in connections))
+    finally:
+        for connection in connections:
+            await connection.close()
+    logger.info("{} {} pooled connections opened".format(TAG, size))
+
+
+# Usuario inexistente, usado so para executar as consultas quentes uma vez
+class _WarmupUser:
+    uuid = uuid.UUID(int=0)
+    username = ""
+
+
+async def prime_caches() -> None:
+    async with AsyncSessionLocal() as db:
+        await tag_repository.load_tag_catalog(db)
+        users = await user_repository.load_username_index(db)
+
+        # Executar as consultas popula o cache de compilacao do SQLAlchemy
+        await post_repository.get_posts_preview(db, _WarmupUser, per_page=1)
+        await post_repository.get_post_detail(db, _WarmupUser, _WarmupUser.uuid)
+        await user_repository.get_users_preview(db, _WarmupUser, per_page=1, search=None, offset=0)
+        await notification_repository.get_notifications_count(db, _WarmupUser)
+    logger.info("{} {} tags in catalog, {} usernames indexed, hot statements compiled".format(
+        TAG, len(tag_catalog), users
+    ))
+
+
+# Estatisticas dos caches por processo, registradas no shutdown (nao ha
+# endpoint publico para elas)
+def log_cache_stats() -> None:
+    logger.info("{} user_cache {}".format(TAG, user_cache.stats()))
+    logger.info("{} unread_cache {}".format(TAG, unread_cache.stats()))
+    logger.info("{} search_cache {}".format(TAG, search_cache.stats()))
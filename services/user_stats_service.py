@@ -0,0 +1,44 @@
+import sys
+import asyncio
+import argparse
+from database import AsyncSessionLocal, async_engine
+from repository import user_stats_repository
+from singleton.log import logger
+
+TAG = "User Stats Service -> "
+
+
+async def rebuild() -> int:
+    async with AsyncSessionLocal() as db:
+        return await user_stats_repository.rebuild_user_stats(db)
+
+
+async def check() -> dict:
+    async with AsyncSessionLocal() as db:
+        mismatches = await user_stats_repository.check_user_stats(db)
+    for user_id, diff in mismatches.items():
+        logger.warning("{} user {} out of sync (stored, expected): {}".format(TAG, user_id, diff))
+    logger.info("{} {} users out of sync".format(TAG, len(mismatches)))
+    return mismatches
+
+
+async def _run(command: str) -> int:
+    try:
+        if command == "rebuild":
+            await rebuild()
+            return 0
+        return 1 if await check() else 0
+    finally:
+        await async_engine.dispose()
+
+
+# Uso: python -m services.user_stats_service rebuild|check
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Maintain the user_stats table")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    args = parser.parse_args(argv)
+    return asyncio.run(_run(args.command))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
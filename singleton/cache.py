@@ -0,0 +1,40 @@
+import os
+from utils.cache import TTLCache
+from utils.prefix_index import PrefixIndex
+from utils.tag_catalog import TagCatalog
+
+# Snapshot das colunas do usuario indexado pelo uuid (sub do token). O cache e
+# por processo: invalidate() so limpa o worker que atendeu a alteracao, entao
+# com varios workers os outros podem servir o usuario (e o ETag do perfil)
+# antigos por ate USER_CACHE_TTL segundos. Mantenha o TTL curto
+user_cache = TTLCache(
+    maxsize=int(os.getenv("USER_CACHE_MAXSIZE", "2048")),
+    ttl=float(os.getenv("USER_CACHE_TTL", "10")),
+)
+
+# Todas as tags em memoria: /categories, validacao de posts e tags do feed
+tag_catalog = TagCatalog(
+    max_age=float(os.getenv("TAG_CATALOG_MAX_AGE", "300")),
+)
+
+# Notificacoes nao lidas por usuario, servido pelo polling de /notifications/count
+unread_cache = TTLCache(
+    maxsize=int(os.getenv("UNREAD_CACHE_MAXSIZE", "4096")),
+    ttl=float(os.getenv("UNREAD_CACHE_TTL", "30")),
+)
+
+# Busca textual: se cada frase e frequente (define recencia x bm25) e a
+# expansao dos prefixos longos. Poupa as consultas ao indice antes da pagina
+# em buscas repetidas; um termo novo leva ate SEARCH_CACHE_TTL segundos para
+# aparecer na expansao de um prefixo ja consultado
+search_cache = TTLCache(
+    maxsize=int(os.getenv("SEARCH_CACHE_MAXSIZE", "4096")),
+    ttl=float(os.getenv("SEARCH_CACHE_TTL", "60")),
+)
+
+# Indices de prefixo em memoria para o autocomplete (/users/suggest e /categories/suggest).
+# O de tags e recarregado junto com o catalogo
+username_index = PrefixIndex(
+    max_age=float(os.getenv("USERNAME_INDEX_MAX_AGE", "300")),
+)
+tag_index = PrefixIndex()
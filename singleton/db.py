@@ -1,11 +1,4 @@
-from database import SessionLocal, AsyncSessionLocal
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close
+from database import AsyncSessionLocal
 
 async def get_async_db():
     async with AsyncSessionLocal() as db:
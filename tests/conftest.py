@@ -0,0 +1,87 @@
+import os
+import re
+import tempfile
+
+# O app le DATABASE_URL, LOG_DIR e o diretorio static na importacao: tudo
+# aponta para um diretorio temporario antes de qualquer import do projeto
+TEST_DIR = tempfile.mkdtemp(prefix="dropit-tests-")
+# TEST_DATABASE_URL (URL async, ex.: postgresql+asyncpg://postgres@localhost/dropit_test)
+# roda a suite contra outro banco, cujo schema e apagado no inicio da sessao.
+# Sem ela os testes usam um SQLite temporario
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+os.environ["DATABASE_URL"] = TEST_DATABASE_URL or "sqlite+aiosqlite:///{}".format(os.path.join(TEST_DIR, "test.db"))
+os.environ.pop("SYNC_DATABASE_URL", None)
+os.environ["LOG_DIR"] = os.path.join(TEST_DIR, "logs")
+# Os testes de orcamento de queries leem X-DB-Query-Count
+os.environ["DB_STATS_HEADERS"] = "true"
+# Os testes de concorrencia enfileiram milhares de escritas no pool e no lock
+# do SQLite; numa maquina carregada a espera passa dos limites padrao
+os.environ.setdefault("SQLITE_BUSY_TIMEOUT", "60000")
+os.environ.setdefault("DB_POOL_TIMEOUT", "300")
+os.makedirs(os.path.join(TEST_DIR, "static"), exist_ok=True)
+os.chdir(TEST_DIR)
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+import models
+from database import SYNC_DATABASE_URL
+from services.startup_service import ALEMBIC_INI
+
+PASSWORD = "Passw0rd!"
+TAGS = [("Amor", "Relações", "#f472b6"), ("Raiva", "Emoções", "#f97316"), ("Luto", "Temas Sensíveis", "#1f2937")]
+
+
+# Apaga o que uma sessao anterior deixou no banco de TEST_DATABASE_URL
+def _reset_schema(engine) -> None:
+    with engine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("DROP SCHEMA public CASCADE"))
+            connection.execute(text("CREATE SCHEMA public"))
+
+
+@pytest.fixture(scope="session")
+def sync_engine():
+    engine = create_engine(SYNC_DATABASE_URL)
+    try:
+        _reset_schema(engine)
+    except OperationalError as error:
+        pytest.skip("TEST_DATABASE_URL unavailable: {}".format(error.orig))
+    command.upgrade(Config(ALEMBIC_INI), "head")
+    with Session(engine) as db:
+        db.add_all(models.Tag(name=name, group=group, color=color) for name, group, color in TAGS)
+        db.commit()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def dialect(sync_engine) -> str:
+    return sync_engine.dialect.name
+
+
+@pytest.fixture(scope="session")
+def client(sync_engine):
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
+
+
+# Registra (se preciso) e deixa o cliente autenticado com o cookie do usuario
+@pytest.fixture
+def login(client):
+    def login(email: str, username: str) -> None:
+        client.post("/api/register", data=dict(
+            email=email, username=username, password=PASSWORD, confirm_password=PASSWORD
+        ))
+        response = client.post("/api/login", json=dict(email=email, password=PASSWORD, remember=False))
+        assert response.status_code == 200, response.text
+        client.cookies.clear()
+        client.cookies.set("access_token", re.search(r"access_token=([^;]+)", response.headers["set-cookie"]).group(1))
+
+    return login
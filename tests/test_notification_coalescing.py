@@ -0,0 +1,69 @@
+import datetime
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+import models
+from api import schemas
+from database import AsyncSessionLocal
+from repository import notification_repository
+
+WINDOW = datetime.timedelta(hours=1)
+
+
+@pytest.fixture(scope="module")
+def people(sync_engine):
+    with Session(sync_engine) as db:
+        users = {
+            name: models.User(username="coalesce_{}".format(name), email="coalesce_{}@example.com".format(name), password="-")
+            for name in ("author", "bob", "alice", "carol")
+        }
+        db.add_all(users.values())
+        db.flush()
+        post = models.Post(title="Coalescido", content="...", user_id=users["author"].uuid)
+        db.add(post)
+        db.commit()
+        return {name: user.uuid for name, user in users.items()}, post.uuid
+
+
+def _reaction(people, post_id, actor: str) -> schemas.NotificationCreateRequest:
+    users, _ = people
+    return schemas.NotificationCreateRequest(
+        title="Nova reação",
+        content="O usuário coalesce_{} reagiu ao seu post 'Coalescido'".format(actor),
+        notification_type="att",
+        user_generator=users[actor],
+        user_receiver=users["author"],
+        post_id=post_id,
+        event="reaction",
+        actor_name="coalesce_{}".format(actor),
+        post_title="Coalescido",
+    )
+
+
+async def _write(post_id, batches: list[list]) -> models.Notification:
+    for batch in batches:
+        async with AsyncSessionLocal() as db:
+            await notification_repository.create_notifications(db, batch, coalesce_window=WINDOW)
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(
+            select(models.Notification).where(models.Notification.post_id == post_id)
+        )).scalar_one()
+
+
+def test_coalesced_notification_counts_distinct_actors(client, people):
+    _, post_id = people
+    toggles = [_reaction(people, post_id, "bob") for _ in range(6)]
+    batches = [
+        toggles[:3],
+        toggles[3:],
+        [_reaction(people, post_id, "alice"), _reaction(people, post_id, "bob")],
+        [_reaction(people, post_id, "carol")],
+    ]
+
+    after_bob = client.portal.call(_write, post_id, batches[:2])
+    assert after_bob.event_count == 1
+    assert after_bob.message == toggles[0].content
+
+    notification = client.portal.call(_write, post_id, batches[2:])
+    assert notification.event_count == 3
+    assert notification.message == "O usuário coalesce_carol e mais 2 pessoas reagiram ao seu post 'Coalescido'"
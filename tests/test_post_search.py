@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy.orm import Session
+import models
+from repository import post_repository
+from singleton.cache import search_cache
+
+HOSTILE = '<script>alert(1)</script> zumbilandia <img src=x onerror="alert(2)"> & fim'
+
+
+@pytest.fixture(scope="module")
+def hostile_post(sync_engine):
+    with Session(sync_engine) as db:
+        author = models.User(username="searcher_author", email="searcher_author@example.com", password="-")
+        db.add(author)
+        db.flush()
+        db.add(models.Post(title="Post com <b>html</b>", content=HOSTILE, user_id=author.uuid))
+        db.commit()
+
+
+# Com limite 1 qualquer termo que casa conta como frequente e a busca lista
+# por recencia, com o snippet calculado no mesmo cursor do FTS
+@pytest.mark.parametrize("rank_candidates", [1000, 1], ids=["ranked", "recent"])
+def test_search_snippet_escapes_post_content(client, login, hostile_post, monkeypatch, rank_candidates):
+    monkeypatch.setattr(post_repository, "SEARCH_RANK_CANDIDATES", rank_candidates)
+    search_cache.clear()
+    login("searcher@example.com", "searcher")
+    response = client.get("/api/posts/preview", params=dict(search="zumbilandia"))
+
+    assert response.status_code == 200
+    posts = response.json()
+    assert len(posts) == 1
+    snippet = posts[0]["snippet"]
+    assert "<mark>zumbilandia</mark>" in snippet
+    assert "&lt;img src=x" in snippet
+    assert "&amp;" in snippet
+    # As unicas tags do trecho sao as marcacoes da busca
+    assert snippet.replace("<mark>", "").replace("</mark>", "").count("<") == 0
+
+
+# O prefixo maior que o indice de prefixo e expandido pelo posts_fts_vocab; com
+# limite 1 a expansao desiste e a busca usa o prefixo direto no MATCH
+@pytest.mark.parametrize("prefix_terms", [32, 1], ids=["expanded", "prefix"])
+def test_search_matches_last_term_as_prefix(client, login, hostile_post, monkeypatch, prefix_terms):
+    monkeypatch.setattr(post_repository, "SEARCH_PREFIX_TERMS", prefix_terms)
+    search_cache.clear()
+    login("searcher@example.com", "searcher")
+    response = client.get("/api/posts/preview", params=dict(search="ZUMBIL"))
+
+    assert response.status_code == 200
+    assert [post["content"] for post in response.json()] == [HOSTILE]
+
+
+# O tokenizer do FTS5 remove acentos; o dicionario portuguese do PostgreSQL nao
+def test_search_prefix_ignores_accents(client, login, hostile_post, dialect):
+    if dialect != "sqlite":
+        pytest.skip("accent folding is only done by the SQLite FTS5 tokenizer")
+    search_cache.clear()
+    login("searcher@example.com", "searcher")
+    response = client.get("/api/posts/preview", params=dict(search="zumbíl"))
+
+    assert response.status_code == 200
+    assert [post["content"] for post in response.json()] == [HOSTILE]
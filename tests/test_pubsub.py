@@ -0,0 +1,20 @@
+from utils.pubsub import PubSub
+
+
+def test_len_tracks_subscribe_and_unsubscribe():
+    hub = PubSub()
+    first = hub.subscribe("a")
+    second = hub.subscribe("a")
+    other = hub.subscribe("b")
+    assert len(hub) == 3
+
+    hub.unsubscribe(first)
+    # Desinscrever duas vezes (ex.: cancelamento seguido do finally) nao desconta de novo
+    hub.unsubscribe(first)
+    assert len(hub) == 2
+    assert hub.has_subscribers("a")
+
+    hub.unsubscribe(second)
+    hub.unsubscribe(other)
+    assert len(hub) == 0
+    assert hub.stats()["keys"] == 0
@@ -0,0 +1,99 @@
+import random
+import asyncio
+import pytest
+from sqlalchemy import select, func
+import models
+from database import AsyncSessionLocal
+from repository import reaction_repository, user_stats_repository
+from services import notification_service
+from services.reaction_counter_service import reaction_buffer
+
+REACTIONS = 2000
+REACTORS = 300
+KINDS = [reaction.value for reaction in models.ReactionType]
+
+
+async def _seed(prefix: str) -> tuple[models.Post, list[models.User]]:
+    async with AsyncSessionLocal() as db:
+        users = [
+            models.User(username="{}{}".format(prefix, i), email="{}{}@example.com".format(prefix, i), password="-")
+            for i in range(REACTORS)
+        ]
+        author = models.User(username=prefix, email="{}@example.com".format(prefix), password="-")
+        db.add_all(users + [author])
+        await db.flush()
+        post = models.Post(title="Concorrencia", content="...", user_id=author.uuid)
+        db.add(post)
+        await db.flush()
+        await user_stats_repository.apply_delta(db, author.uuid, last_post_date=post.created_at, post_count=1)
+        await db.commit()
+    return post, users
+
+
+async def _react_concurrently(post: models.Post, users: list[models.User]) -> list[str]:
+    async def react(user: models.User, kind: str) -> str:
+        async with AsyncSessionLocal() as db:
+            response = await reaction_repository.create_post_reaction(db, post, user, kind)
+        return response["status"]
+
+    # Varios toques do mesmo usuario no mesmo post: inserts, trocas e a mesma
+    # reacao repetida (no-op). Nao existe remocao de reacao na API
+    return await asyncio.gather(*(
+        react(random.choice(users), random.choice(KINDS)) for _ in range(REACTIONS)
+    ))
+
+
+async def _stored_counts(post: models.Post) -> tuple[dict, dict, dict]:
+    async with AsyncSessionLocal() as db:
+        counts = await db.get(models.PostReactionCount, post.uuid)
+        rows = dict((await db.execute(
+            select(models.PostReaction.reaction_type, func.count())
+            .where(models.PostReaction.post_id == post.uuid)
+            .group_by(models.PostReaction.reaction_type)
+        )).all())
+        mismatches = await user_stats_repository.check_user_stats(db)
+    expected = {reaction.value: rows.get(reaction, 0) for reaction in models.ReactionType}
+    stored = {kind: getattr(counts, kind) if counts else 0 for kind in KINDS}
+    return stored, expected, mismatches
+
+
+@pytest.mark.parametrize("buffered", [False, True], ids=["direct", "buffered"])
+def test_parallel_reactions_keep_counts_consistent(client, monkeypatch, buffered):
+    random.seed(16)
+    monkeypatch.setattr(reaction_buffer, "enabled", buffered)
+
+    async def scenario():
+        post, users = await _seed("react{}_".format("b" if buffered else "d"))
+        if buffered:
+            await reaction_buffer.start()
+        try:
+            statuses = await _react_concurrently(post, users)
+        finally:
+            if buffered:
+                await reaction_buffer.stop()
+        return post, statuses, await _stored_counts(post)
+
+    post, statuses, (stored, expected, mismatches) = client.portal.call(scenario)
+
+    assert statuses.count("success") == REACTIONS
+    assert sum(expected.values()) > 0
+    assert stored == expected
+    assert post.user_id not in mismatches
+
+
+@pytest.mark.parametrize("buffered", [False, True], ids=["direct", "buffered"])
+def test_repeated_reaction_changes_nothing(client, login, monkeypatch, buffered):
+    monkeypatch.setattr(reaction_buffer, "enabled", buffered)
+    notified = []
+    monkeypatch.setattr(notification_service, "create_reaction_notification", lambda *args: notified.append(args))
+    post, _ = client.portal.call(_seed, "repeat{}_".format("b" if buffered else "d"))
+    login("repeater@example.com", "repeater")
+
+    responses = [
+        client.post("/api/posts/reaction", json=dict(post_uuid=str(post.uuid), reaction=kind)).json()
+        for kind in ("love", "love", "like")
+    ]
+
+    assert [response["changed"] for response in responses] == [True, False, True]
+    assert responses[1]["counts"] == responses[0]["counts"]
+    assert len(notified) == 2
@@ -0,0 +1,62 @@
+import random
+import datetime
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+import models
+from database import AsyncSessionLocal
+from repository import user_repository
+from utils.query_stats import assert_query_budget, query_budget
+
+# Pagina de usuarios + top tags de todos eles; nao pode crescer com per_page
+USERS_PREVIEW_QUERIES = 2
+DIRECTORY_USERS = 40
+
+
+@pytest.fixture(scope="module")
+def directory(sync_engine):
+    random.seed(14)
+    now = datetime.datetime.utcnow()
+    with Session(sync_engine) as db:
+        tags = db.scalars(select(models.Tag)).all()
+        for i in range(DIRECTORY_USERS):
+            user = models.User(
+                username="directory{}".format(i),
+                email="directory{}@example.com".format(i),
+                password="-",
+                created_at=now - datetime.timedelta(minutes=i)
+            )
+            db.add(user)
+            db.flush()
+            for j in range(3):
+                post = models.Post(title="Post {}".format(j), content="...", user_id=user.uuid)
+                post.tags.extend(random.sample(tags, k=2))
+                db.add(post)
+        db.commit()
+
+
+@pytest.mark.parametrize("per_page", [5, 30])
+def test_users_preview_query_budget(client, login, directory, per_page):
+    login("preview@example.com", "preview")
+    response = client.get("/api/users/preview", params=dict(per_page=per_page, search="directory"))
+
+    assert response.status_code == 200
+    users = response.json()
+    assert len(users) == per_page
+    assert all(user["top_tags"] for user in users)
+    assert_query_budget(response, USERS_PREVIEW_QUERIES)
+
+
+def test_users_preview_queries_do_not_grow_with_page_size(client, login, directory):
+    login("preview@example.com", "preview")
+
+    async def count_queries(per_page: int) -> int:
+        async with AsyncSessionLocal() as db:
+            user = await user_repository.get_user_by_email(db, "preview@example.com")
+            with query_budget(USERS_PREVIEW_QUERIES) as stats:
+                await user_repository.get_users_preview(db, user, per_page, "directory", 0)
+        return stats.count
+
+    small = client.portal.call(count_queries, 5)
+    large = client.portal.call(count_queries, 30)
+    assert small == large
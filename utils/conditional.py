@@ -0,0 +1,50 @@
+import hashlib
+from fastapi import Request, Response, status
+
+# Respostas dependem do usuario do cookie: so o navegador guarda, e sempre revalida
+PRIVATE_CACHE = "private, no-cache"
+
+
+# ETag fraco a partir das versoes das linhas que compoem a resposta
+def make_etag(*parts) -> str:
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+    return 'W/"{}"'.format(digest)
+
+
+def _strip_weak(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_fresh(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Comparacao fraca (RFC 9110): ignora o prefixo W/
+    current = _strip_weak(etag)
+    return any(_strip_weak(tag) == current for tag in header.split(","))
+
+
+def validator_headers(etag: str, cache_control: str = PRIVATE_CACHE, vary: str | None = "Cookie") -> dict:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if vary:
+        headers["Vary"] = vary
+    return headers
+
+
+def not_modified(
+        etag: str,
+        cache_control: str = PRIVATE_CACHE,
+        vary: str | None = "Cookie",
+        headers: dict | None = None
+    ) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={**validator_headers(etag, cache_control, vary), **(headers or {})}
+    )
+
+
+def set_validators(response: Response, etag: str, cache_control: str = PRIVATE_CACHE, vary: str | None = "Cookie") -> None:
+    response.headers.update(validator_headers(etag, cache_control, vary))
@@ -0,0 +1,34 @@
+import json
+import base64
+import datetime
+from uuid import UUID
+from fastapi import HTTPException, status
+
+
+# Cursor opaco com a chave (created_at, uuid) do ultimo item da pagina
+def encode_cursor(created_at: datetime.datetime | str, item_uuid: UUID | str) -> str:
+    if isinstance(created_at, datetime.datetime):
+        created_at = created_at.isoformat()
+    raw = json.dumps([created_at, str(item_uuid)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime.datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, item_uuid = json.loads(raw)
+        return datetime.datetime.fromisoformat(created_at), UUID(item_uuid)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def next_cursor(
+        items: list[dict],
+        per_page: int,
+        created_key: str = "created_at",
+        uuid_key: str = "uuid"
+    ) -> str | None:
+    if len(items) < per_page:
+        return None
+    last = items[-1]
+    return encode_cursor(last[created_key], last[uuid_key])
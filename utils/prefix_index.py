@@ -0,0 +1,73 @@
+import time
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Any, Hashable, Iterable
+
+
+def normalize(text: str) -> str:
+    # Sem acentos e sem diferenca de caixa: "Ação" e "acao" caem no mesmo prefixo
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+# Array ordenado de (chave normalizada, id) com busca por bisect. Cada id
+# aparece uma unica vez, entao add() de um id existente substitui a entrada
+# (renomear um usuario e so chamar add com o novo nome). add() so vale no
+# processo atual; stale() diz quando recarregar tudo para pegar o que mudou em
+# outros workers.
+class PrefixIndex:
+    def __init__(self, max_age: float = 300.0):
+        self.max_age = max_age
+        self.loaded_at: float | None = None
+        self._keys: list[tuple[str, Any]] = []
+        self._entries: dict[Hashable, tuple[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stale(self, max_age: float | None = None) -> bool:
+        if self.loaded_at is None:
+            return True
+        return time.monotonic() - self.loaded_at >= (self.max_age if max_age is None else max_age)
+
+    def load(self, items: Iterable[tuple[Hashable, str, Any]]) -> None:
+        entries = {item_id: (normalize(key), value) for item_id, key, value in items}
+        keys = sorted((key, item_id) for item_id, (key, _) in entries.items())
+        with self._lock:
+            self.loaded_at = time.monotonic()
+            self._entries = entries
+            self._keys = keys
+
+    def add(self, item_id: Hashable, key: str, value: Any) -> None:
+        with self._lock:
+            self._discard(item_id)
+            normalized = normalize(key)
+            self._entries[item_id] = (normalized, value)
+            insort(self._keys, (normalized, item_id))
+
+    def remove(self, item_id: Hashable) -> None:
+        with self._lock:
+            self._discard(item_id)
+
+    def _discard(self, item_id: Hashable) -> None:
+        entry = self._entries.pop(item_id, None)
+        if entry is None:
+            return
+        position = bisect_left(self._keys, (entry[0], item_id))
+        if position < len(self._keys) and self._keys[position] == (entry[0], item_id):
+            del self._keys[position]
+
+    def search(self, prefix: str, limit: int = 10) -> list[Any]:
+        normalized = normalize(prefix)
+        results = []
+        with self._lock:
+            position = bisect_left(self._keys, (normalized,))
+            while position < len(self._keys) and len(results) < limit:
+                key, item_id = self._keys[position]
+                if not key.startswith(normalized):
+                    break
+                results.append(self._entries[item_id][1])
+                position += 1
+        return results
@@ -0,0 +1,67 @@
+import asyncio
+from typing import Any, Hashable
+
+
+# Fila limitada por conexao: quando o cliente nao consome, a mensagem mais
+# antiga e descartada para que um cliente lento nao acumule memoria
+class Subscription:
+    def __init__(self, key: Hashable, maxsize: int):
+        self.key = key
+        self.dropped = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def push(self, message: Any) -> None:
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(message)
+
+    async def get(self, timeout: float | None = None) -> Any:
+        return await asyncio.wait_for(self._queue.get(), timeout=timeout)
+
+
+# Pub/sub em processo por chave (ex.: uuid do usuario). Usado so a partir do
+# event loop, entao nao precisa de lock.
+class PubSub:
+    def __init__(self, buffer_size: int = 16):
+        self.buffer_size = buffer_size
+        self.published = 0
+        self._subscribers: dict[Hashable, set[Subscription]] = {}
+        # Contador mantido em subscribe/unsubscribe: o limite de conexoes do
+        # stream consulta len() a cada conexao e nao pode percorrer as chaves
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def subscribe(self, key: Hashable) -> Subscription:
+        subscription = Subscription(key, self.buffer_size)
+        self._subscribers.setdefault(key, set()).add(subscription)
+        self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscribers.get(subscription.key)
+        if subscriptions is None or subscription not in subscriptions:
+            return
+        subscriptions.remove(subscription)
+        self._count -= 1
+        if not subscriptions:
+            del self._subscribers[subscription.key]
+
+    def has_subscribers(self, key: Hashable) -> bool:
+        return key in self._subscribers
+
+    def publish(self, key: Hashable, message: Any) -> int:
+        subscriptions = self._subscribers.get(key, ())
+        for subscription in subscriptions:
+            subscription.push(message)
+        self.published += len(subscriptions)
+        return len(subscriptions)
+
+    def stats(self) -> dict:
+        return {
+            "keys": len(self._subscribers),
+            "subscriptions": len(self),
+            "published": self.published,
+        }
@@ -0,0 +1,107 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from singleton.log import logger
+
+TAG = "Query Stats -> "
+# X-DB-Query-Count e Server-Timing expoem detalhes internos: so em dev e testes
+DB_STATS_HEADERS = os.getenv("DB_STATS_HEADERS", "false").lower() in ("1", "true", "yes")
+DB_QUERY_WARN = int(os.getenv("DB_QUERY_WARN", "20"))
+DB_SLOW_MS = float(os.getenv("DB_SLOW_MS", "200"))
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_statement: str | None = None
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.slowest_ms:
+            self.slowest_ms = elapsed_ms
+            self.slowest_statement = statement
+
+
+_current_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start"].pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, (time.perf_counter() - started) * 1000)
+
+
+def install(engine: Engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def track_queries():
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+# Helpers para testes: falham quando uma rota ultrapassa o numero de consultas declarado
+@contextmanager
+def query_budget(max_queries: int):
+    with track_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        raise AssertionError("Expected at most {} queries, got {} (slowest: {})".format(
+            max_queries, stats.count, stats.slowest_statement
+        ))
+
+
+def assert_query_budget(response, max_queries: int) -> None:
+    if "X-DB-Query-Count" not in response.headers:
+        raise AssertionError("X-DB-Query-Count missing; set DB_STATS_HEADERS=true")
+    count = int(response.headers["X-DB-Query-Count"])
+    if count > max_queries:
+        raise AssertionError("{} {} ran {} queries, budget is {}".format(
+            response.request.method, response.request.url.path, count, max_queries
+        ))
+
+
+class QueryStatsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+            async def send_with_stats(message):
+                if message["type"] == "http.response.start" and DB_STATS_HEADERS:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-db-query-count", str(stats.count).encode()))
+                    headers.append((b"server-timing", 'db;dur={:.2f};desc="{} queries"'.format(
+                        stats.total_ms, stats.count
+                    ).encode()))
+                    message["headers"] = headers
+                await send(message)
+
+            await self.app(scope, receive, send_with_stats)
+
+        if stats.count > DB_QUERY_WARN or stats.total_ms > DB_SLOW_MS:
+            logger.warning("{} {} {} ran {} queries in {:.1f}ms, slowest {:.1f}ms: {}".format(
+                TAG, scope["method"], scope["path"], stats.count, stats.total_ms,
+                stats.slowest_ms, stats.slowest_statement
+            ))
@@ -1,9 +1,25 @@
+import os
 import re
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt bloqueia o event loop; as variantes async rodam num pool limitado.
+# "process" e o padrao porque o backend os_crypt do passlib nao libera o GIL.
+HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "process")
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "32"))
+
+_executor: Executor | None = None
+_executor_lock = threading.Lock()
+_pending = 0
+_pending_lock = threading.Lock()
+
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -11,6 +27,56 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password, hashed_password) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+
+def _get_executor() -> Executor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            if HASH_EXECUTOR == "thread":
+                _executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")
+            else:
+                # fork a partir de um processo com event loop e threads (aiosqlite,
+                # pool de conexoes) herda locks e sockets; forkserver sobe os
+                # workers a partir de um processo limpo
+                _executor = ProcessPoolExecutor(
+                    max_workers=HASH_WORKERS,
+                    mp_context=multiprocessing.get_context("forkserver")
+                )
+        return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+async def _run_in_pool(func, *args):
+    global _pending
+    with _pending_lock:
+        if _pending >= HASH_WORKERS + HASH_QUEUE_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server busy, try again later",
+                headers={"Retry-After": "1"}
+            )
+        _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), func, *args)
+    finally:
+        with _pending_lock:
+            _pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_pool(hash_password, password)
+
+async def verify_password_async(plain_password, hashed_password) -> bool:
+    return await _run_in_pool(verify_password, plain_password, hashed_password)
+
 def validate_password(password:str, confirm_password:str) -> None:
     if password != confirm_password:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Passwords don't match")
@@ -32,4 +98,4 @@ def validate_password(password:str, confirm_password:str) -> None:
     
 def check_current_password(plain_password: str, hashed_password: str) -> None:
     if not verify_password(plain_password, hashed_password):
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Current password is incorrect")
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Current password is incorrect")
@@ -0,0 +1,82 @@
+import time
+import hashlib
+import threading
+import uuid
+from typing import Any, Iterable
+
+
+# Catalogo de tags em memoria (sao poucas e quase nunca mudam). Cada carga
+# substitui tudo de uma vez; a versao so avanca quando o conteudo muda e o ETag
+# e derivado do conteudo, entao todos os workers respondem o mesmo ETag para o
+# mesmo catalogo. Listas e dicts devolvidos sao compartilhados: somente leitura.
+class TagCatalog:
+    def __init__(self, max_age: float = 300.0):
+        self.max_age = max_age
+        self.version = 0
+        self.etag: str | None = None
+        self.loaded_at: float | None = None
+        self._tags: dict[uuid.UUID, Any] = {}
+        self._previews: dict[uuid.UUID, dict] = {}
+        self._active: list = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._tags)
+
+    def stale(self, max_age: float | None = None) -> bool:
+        if self.loaded_at is None:
+            return True
+        return time.monotonic() - self.loaded_at >= (self.max_age if max_age is None else max_age)
+
+    # Recebe pares (tag, ativa); a tag precisa de uuid, name, group e color
+    def load(self, items: Iterable[tuple[Any, bool]]) -> bool:
+        items = list(items)
+        digest = hashlib.sha1()
+        for tag, active in sorted(items, key=lambda item: item[0].uuid):
+            digest.update("{}|{}|{}|{}|{}\n".format(tag.uuid, tag.name, tag.group, tag.color, active).encode())
+        etag = '"tags-{}"'.format(digest.hexdigest()[:16])
+
+        with self._lock:
+            self.loaded_at = time.monotonic()
+            if etag == self.etag:
+                return False
+            self._tags = {tag.uuid: tag for tag, _ in items}
+            self._previews = {tag.uuid: {"name": tag.name, "color": tag.color} for tag, _ in items}
+            self._active = [tag for tag, active in items if active]
+            self.etag = etag
+            self.version += 1
+            return True
+
+    def active(self) -> list:
+        return self._active
+
+    def get(self, tag_id: uuid.UUID) -> Any | None:
+        return self._tags.get(tag_id)
+
+    def previews(self, tag_ids: Iterable[uuid.UUID]) -> list[dict]:
+        previews = self._previews
+        return [previews[tag_id] for tag_id in tag_ids if tag_id in previews]
+
+    # Separa uuids (em texto) conhecidos dos desconhecidos ou invalidos
+    def resolve(self, raw_ids: Iterable[str]) -> tuple[list[uuid.UUID], list[str]]:
+        found, missing = [], []
+        for raw_id in raw_ids:
+            try:
+                tag_id = uuid.UUID(str(raw_id))
+            except ValueError:
+                missing.append(raw_id)
+                continue
+            if tag_id in self._tags:
+                if tag_id not in found:
+                    found.append(tag_id)
+            else:
+                missing.append(raw_id)
+        return found, missing
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "etag": self.etag,
+            "tags": len(self._tags),
+            "active": len(self._active),
+        }